@@ -1,6 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery
 from .models import UserProfile, Organization, MentorAssignment
+from .services import offboard_mentors, rebalance_mentees
 
 # Apply MentorFlow branding to admin site
 admin.site.site_title = getattr(settings, 'ADMIN_SITE_TITLE', 'MentorFlow Administration')
@@ -22,20 +24,36 @@ class OrganizationAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'join_code', 'created_by__username']
     readonly_fields = ['join_code', 'created_at']
+    actions = ['rebalance_selected']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            mentor_count=Count('user_profiles', filter=Q(user_profiles__role='mentor')),
+            mentee_count=Count('user_profiles', filter=Q(user_profiles__role='mentee'))
+        )
 
     def get_mentor_count(self, obj):
-        return obj.get_mentors().count()
+        return obj.mentor_count
     get_mentor_count.short_description = 'Mentors'
+    get_mentor_count.admin_order_field = 'mentor_count'
 
     def get_mentee_count(self, obj):
-        return obj.get_mentees().count()
+        return obj.mentee_count
     get_mentee_count.short_description = 'Mentees'
+    get_mentee_count.admin_order_field = 'mentee_count'
+
+    def rebalance_selected(self, request, queryset):
+        for organization in queryset:
+            assignments = rebalance_mentees(organization, assigned_by=request.user)
+            self.message_user(request, f'{organization.name}: {len(assignments)} mentee(s) reassigned.')
+    rebalance_selected.short_description = 'Rebalance mentees across mentors'
 
 
 @admin.register(MentorAssignment)
 class MentorAssignmentAdmin(admin.ModelAdmin):
     list_display = ['mentee', 'mentor', 'is_active', 'assigned_at', 'assigned_by']
     list_filter = ['is_active', 'assigned_at']
+    list_select_related = ['mentee__user', 'mentee__organization', 'mentor__user', 'mentor__organization', 'assigned_by']
     search_fields = ['mentee__user__username', 'mentor__user__username', 'notes']
     readonly_fields = ['assigned_at']
     date_hierarchy = 'assigned_at'
@@ -45,14 +63,31 @@ class MentorAssignmentAdmin(admin.ModelAdmin):
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'role', 'organization', 'email_notifications_enabled', 'sms_notifications_enabled', 'get_current_mentor_display']
     list_filter = ['role', 'organization', 'email_notifications_enabled', 'sms_notifications_enabled']
+    list_select_related = ['user', 'organization']
     search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name', 'organization__name']
     inlines = [MentorAssignmentInline]
+    actions = ['offboard_selected']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            current_mentor_username=Subquery(
+                MentorAssignment.objects.filter(mentee=OuterRef('pk'), is_active=True)
+                .values('mentor__user__username')[:1]
+            )
+        )
 
     def get_current_mentor_display(self, obj):
         if obj.role == 'mentee':
-            mentor = obj.get_current_mentor()
-            if mentor:
-                return mentor.user.username
-            return 'Unassigned'
+            return obj.current_mentor_username or 'Unassigned'
         return 'N/A'
     get_current_mentor_display.short_description = 'Current Mentor'
+    get_current_mentor_display.admin_order_field = 'current_mentor_username'
+
+    def offboard_selected(self, request, queryset):
+        mentors = list(queryset.filter(role='mentor'))
+        if not mentors:
+            self.message_user(request, 'No mentors selected.', messages.WARNING)
+            return
+        moved = offboard_mentors(mentors, assigned_by=request.user)
+        self.message_user(request, f'{len(mentors)} mentor(s) offboarded, {moved} mentee(s) reassigned.')
+    offboard_selected.short_description = 'Offboard selected mentors (reassign their mentees)'
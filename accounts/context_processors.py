@@ -0,0 +1,3 @@
+def identity(request):
+    """Expose ``request.identity`` to templates as ``identity``."""
+    return {'identity': getattr(request, 'identity', None)}
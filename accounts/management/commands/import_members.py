@@ -0,0 +1,200 @@
+import csv
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Organization, UserProfile, MentorAssignment
+from accounts.services import invalidate_mentee_user_ids, lock_organization, mentors_by_load
+
+FIELDS = ['username', 'email', 'first_name', 'last_name', 'role', 'phone_number', 'password', 'password_hash']
+
+
+def read_rows(path, fmt):
+    """
+    Stream ``(line_number, row)`` pairs from a CSV (with header) or JSON
+    Lines file. Rows are dicts; a JSON line that is not an object is
+    yielded as the reason it is rejected instead.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, f'invalid JSON ({e})'
+                    continue
+                yield line_number, row if isinstance(row, dict) else 'not a JSON object'
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = ('Bulk import users into an organization from a CSV or JSON Lines file, '
+            'assigning mentees to mentors in a balanced way.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or JSON Lines file. Columns: ' + ', '.join(FIELDS))
+        parser.add_argument('--organization', required=True, help='Join code of the target organization')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows written per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes used to hash plain-text passwords')
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(join_code=options['organization'].upper())
+        except Organization.DoesNotExist:
+            raise CommandError(f"No organization with join code {options['organization']!r}")
+
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.json')) else 'csv')
+        self.stats = {'imported': 0, 'skipped': 0, 'invalid': 0, 'assigned': 0}
+        started = time.monotonic()
+
+        # Workers set Django up themselves so this also works with the spawn start method
+        self.workers = max(1, options['workers'] or 1)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup) as pool:
+            for chunk in chunked(read_rows(options['path'], fmt), options['chunk_size']):
+                self.import_chunk(chunk, organization, pool)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{self.stats['imported']} imported...")
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.stats['imported']} member(s) into {organization.name} "
+            f"({self.stats['assigned']} mentee(s) assigned, {self.stats['skipped']} existing username(s) skipped, "
+            f"{self.stats['invalid']} invalid row(s)) in {elapsed:.1f}s "
+            f"- {self.stats['imported'] / elapsed:.0f} rows/s"
+        ))
+
+    def import_chunk(self, rows, organization, pool):
+        rows = self.drop_existing(self.validate(rows))
+
+        # Plain-text passwords of new users are hashed in parallel; pre-hashed
+        # ones are kept and rows without a password get an unusable one (reset by email)
+        to_hash = [row for row in rows if row.get('password') and not row.get('password_hash')]
+        hashes = pool.map(make_password, [row['password'] for row in to_hash],
+                          chunksize=max(1, len(to_hash) // (self.workers * 4)))
+        for row, password_hash in zip(to_hash, hashes):
+            row['password_hash'] = password_hash
+
+        with transaction.atomic():
+            # Usernames taken while the passwords were being hashed are skipped too
+            new_rows = self.drop_existing(rows)
+            users = [
+                User(
+                    username=row['username'],
+                    email=row.get('email') or '',
+                    first_name=row.get('first_name') or '',
+                    last_name=row.get('last_name') or '',
+                    password=row.get('password_hash') or make_password(None)
+                )
+                for row in new_rows
+            ]
+
+            # bulk_create skips the post_save signals, so profiles are created here
+            users = User.objects.bulk_create(users)
+            profiles = UserProfile.objects.bulk_create([
+                UserProfile(
+                    user=user,
+                    role=row['role'],
+                    organization=organization,
+                    phone_number=row.get('phone_number') or None
+                )
+                for user, row in zip(users, new_rows)
+            ])
+
+            # bulk_create sends no signals, so the mentors' cached mentee sets are dropped here
+            assignments = MentorAssignment.objects.bulk_create(self.balanced_assignments(profiles, organization))
+            invalidate_mentee_user_ids(assignment.mentor_id for assignment in assignments)
+            self.stats['imported'] += len(users)
+
+    def validate(self, rows):
+        valid = []
+        for line_number, row in rows:
+            if isinstance(row, str):
+                problem = row
+            else:
+                row = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items()}
+                problem = None
+                if not row.get('username'):
+                    problem = 'missing username'
+                elif row.get('role') not in ('mentor', 'mentee'):
+                    problem = f"role must be 'mentor' or 'mentee', got {row.get('role')!r}"
+                elif row.get('password_hash'):
+                    try:
+                        identify_hasher(row['password_hash'])
+                    except ValueError:
+                        problem = 'unrecognized password_hash'
+
+            if problem:
+                self.stats['invalid'] += 1
+                self.stderr.write(f'Row {line_number}: {problem}, skipped')
+            else:
+                valid.append(row)
+        return valid
+
+    def drop_existing(self, rows):
+        """Skip rows whose username is already taken or repeated earlier in the file."""
+        existing = set(User.objects.filter(
+            username__in=[row['username'] for row in rows]
+        ).values_list('username', flat=True))
+
+        new_rows = []
+        for row in rows:
+            if row['username'] in existing:
+                self.stats['skipped'] += 1
+                continue
+            existing.add(row['username'])
+            new_rows.append(row)
+        return new_rows
+
+    def balanced_assignments(self, profiles, organization):
+        """
+        Assign this chunk's mentees to the organization's mentors, always
+        picking the least loaded one.
+
+        Loads come from one locked, annotated query per chunk (so joins that
+        happen during the import are accounted for) and are tracked in a heap.
+        """
+        mentees = [profile for profile in profiles if profile.role == 'mentee']
+        if not mentees:
+            return []
+
+        lock_organization(organization)
+        heap = [(mentor.active_mentee_count, mentor.pk) for mentor in mentors_by_load(organization)]
+        if not heap:
+            return []
+        heapq.heapify(heap)
+
+        assignments = []
+        for mentee in mentees:
+            load, mentor_id = heapq.heappop(heap)
+            assignments.append(MentorAssignment(
+                mentee=mentee,
+                mentor_id=mentor_id,
+                notes='Assigned by bulk import'
+            ))
+            heapq.heappush(heap, (load + 1, mentor_id))
+
+        self.stats['assigned'] += len(assignments)
+        return assignments
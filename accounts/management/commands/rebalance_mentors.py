@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Organization
+from accounts.services import offboard_mentors, plan_rebalance, rebalance_mentees
+
+
+class Command(BaseCommand):
+    help = ("Spread an organization's mentees evenly over its mentors, optionally "
+            "offboarding mentors first. Affected mentors get one digest each.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', required=True, help='Join code of the organization')
+        parser.add_argument('--offboard', nargs='+', default=[], metavar='USERNAME',
+                            help='Mentors to remove from the organization; their mentees are reassigned')
+        parser.add_argument('--dry-run', action='store_true', help='Only print the planned reassignments')
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(join_code=options['organization'].upper())
+        except Organization.DoesNotExist:
+            raise CommandError(f"No organization with join code {options['organization']!r}")
+
+        offboarding = list(organization.get_mentors().filter(user__username__in=options['offboard']))
+        missing = set(options['offboard']) - {mentor.user.username for mentor in offboarding}
+        if missing:
+            raise CommandError(f"Not mentors of {organization.name}: {', '.join(sorted(missing))}")
+
+        if options['dry_run']:
+            mentors, moves = plan_rebalance(organization, exclude_mentors=offboarding)
+            for _, username, _, new_mentor_id in moves:
+                self.stdout.write(f'{username} -> {mentors[new_mentor_id].user.username}')
+            self.stdout.write(f'{len(moves)} mentee(s) would be reassigned.')
+            return
+
+        if offboarding:
+            moved = offboard_mentors(offboarding)
+        else:
+            moved = len(rebalance_mentees(organization))
+        self.stdout.write(self.style.SUCCESS(f'{moved} mentee(s) reassigned in {organization.name}.'))
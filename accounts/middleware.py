@@ -0,0 +1,85 @@
+from functools import cached_property
+
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile, MentorAssignment
+from .services import mentee_user_ids
+
+
+class Identity:
+    """
+    Who the current user is within the platform, loaded once per request.
+
+    Every attribute is fetched on first access and memoized, so a request
+    costs at most one query each for the profile (with its organization),
+    the active mentor assignment and the set of assigned mentees, however
+    often views and templates read them; the mentee set usually comes from
+    the cache instead.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def profile(self):
+        if not self.user.is_authenticated:
+            return None
+        profile = UserProfile.objects.select_related('organization').filter(user=self.user).first()
+        if profile is not None:
+            # Share the instance so request.user.profile hits no extra queries
+            profile.user = self.user
+            User.profile.related.set_cached_value(self.user, profile)
+        return profile
+
+    @property
+    def role(self):
+        return self.profile.role if self.profile else None
+
+    @property
+    def organization(self):
+        return self.profile.organization if self.profile else None
+
+    @property
+    def is_mentor(self):
+        return self.role == 'mentor'
+
+    @property
+    def is_mentee(self):
+        return self.role == 'mentee'
+
+    @cached_property
+    def current_assignment(self):
+        """The mentee's active MentorAssignment, with the mentor's profile and user."""
+        if not self.is_mentee:
+            return None
+        return MentorAssignment.objects.filter(
+            mentee=self.profile, is_active=True
+        ).select_related('mentor__user').first()
+
+    @property
+    def current_mentor(self):
+        assignment = self.current_assignment
+        return assignment.mentor if assignment else None
+
+    @cached_property
+    def mentee_user_ids(self):
+        """User ids of the mentor's active mentees (served from the cache)."""
+        if not self.is_mentor:
+            return frozenset()
+        return mentee_user_ids(self.profile.pk)
+
+    def is_mentor_of(self, user):
+        """Whether ``user`` (a User or user id) is one of this mentor's active mentees."""
+        return getattr(user, 'pk', user) in self.mentee_user_ids
+
+
+class IdentityMiddleware:
+    """Attach a lazy ``request.identity``; must come after AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity = SimpleLazyObject(lambda: Identity(request.user))
+        return self.get_response(request)
@@ -53,6 +53,39 @@ class UserProfile(models.Model):
         org_name = self.organization.name if self.organization else "No Org"
         return f"{self.user.username} - {self.get_role_display()} ({org_name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot()
+
+    def _snapshot(self):
+        """Remember the current (non-deferred) field values to detect changes later."""
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def get_dirty_fields(self):
+        """
+        Names of the fields changed since the profile was loaded or last saved.
+
+        An unsaved profile reports all of its concrete fields.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self.pk is None or loaded is None:
+            return [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
     def get_current_mentor(self):
         """Get the currently assigned mentor for this mentee."""
         if self.role == 'mentee':
@@ -90,16 +123,28 @@ class MentorAssignment(models.Model):
         status = "Active" if self.is_active else "Inactive"
         return f"{self.mentee.user.username} → {self.mentor.user.username} ({status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the cache invalidation also reach the previous mentor on reassignment
+        instance._loaded_mentor_id = instance.__dict__.get('mentor_id')
+        return instance
+
     def save(self, *args, **kwargs):
         # Ensure both users are in the same organization
-        if self.mentee.organization != self.mentor.organization:
+        if self.mentee.organization_id != self.mentor.organization_id:
             raise ValueError("Mentor and mentee must be in the same organization")
 
-        # Deactivate other active assignments for this mentee
+        # Deactivate other active assignments for this mentee, remembering
+        # whose mentee sets changed
+        self._deactivated_mentor_ids = []
         if self.is_active:
-            MentorAssignment.objects.filter(
+            others = MentorAssignment.objects.filter(
                 mentee=self.mentee,
                 is_active=True
-            ).exclude(pk=self.pk).update(is_active=False)
+            ).exclude(pk=self.pk)
+            self._deactivated_mentor_ids = list(others.values_list('mentor_id', flat=True))
+            if self._deactivated_mentor_ids:
+                others.update(is_active=False)
 
         super().save(*args, **kwargs)
@@ -0,0 +1,245 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from notifications.models import Notification
+from notifications.services import NotificationService
+from .models import Organization, MentorAssignment, UserProfile
+
+MENTEE_IDS_CACHE_KEY = 'accounts:mentee-user-ids:{}'
+
+
+def lock_organization(organization):
+    """
+    Serialize membership changes of an organization until the transaction ends.
+
+    Uses a row lock where the database has one. SQLite ignores
+    select_for_update, so there the row is written instead: the first write
+    takes the database's write lock, which other writers wait for.
+    """
+    queryset = Organization.objects.filter(pk=organization.pk)
+    if transaction.get_connection().features.has_select_for_update:
+        queryset.select_for_update().only('pk').get()
+    else:
+        queryset.update(is_active=F('is_active'))
+
+
+def mentors_by_load(organization):
+    """Mentors of an organization annotated with their active mentee count, least loaded first."""
+    return organization.get_mentors().annotate(
+        active_mentee_count=Count('mentor_assignments', filter=Q(mentor_assignments__is_active=True))
+    ).order_by('active_mentee_count', 'id')
+
+
+def assign_least_loaded_mentor(mentee_profile, organization, notes=''):
+    """
+    Assign a mentee to the organization's mentor with the fewest active mentees.
+
+    The organization is locked for the duration of the transaction, so
+    concurrent joins to the same organization pick mentors one after another
+    instead of all landing on the same "least loaded" mentor.
+
+    Returns:
+        The new MentorAssignment, or None if the organization has no mentors.
+    """
+    with transaction.atomic():
+        lock_organization(organization)
+
+        mentor = mentors_by_load(organization).select_related('user').first()
+        if mentor is None:
+            return None
+
+        return MentorAssignment.objects.create(
+            mentee=mentee_profile,
+            mentor=mentor,
+            notes=notes
+        )
+
+
+def mentee_user_ids(mentor_profile_id):
+    """
+    User ids of a mentor's active mentees in the mentor's organization.
+
+    The set is kept in the cache and invalidated by the accounts signals
+    whenever an assignment or a profile's organization changes.
+    """
+    key = MENTEE_IDS_CACHE_KEY.format(mentor_profile_id)
+    user_ids = cache.get(key)
+    if user_ids is None:
+        user_ids = frozenset(MentorAssignment.objects.filter(
+            mentor_id=mentor_profile_id,
+            is_active=True,
+            mentee__organization_id=F('mentor__organization_id')
+        ).values_list('mentee__user_id', flat=True))
+        cache.set(key, user_ids, getattr(settings, 'MENTEE_IDS_CACHE_TIMEOUT', 300))
+    return user_ids
+
+
+def invalidate_mentee_user_ids(mentor_profile_ids):
+    """
+    Drop the cached mentee sets of the given mentors.
+
+    Called again once the transaction commits, so a request that read the
+    old rows in the meantime cannot leave a stale set behind.
+    """
+    keys = [MENTEE_IDS_CACHE_KEY.format(pk) for pk in set(mentor_profile_ids) if pk is not None]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def plan_rebalance(organization, exclude_mentors=()):
+    """
+    Work out the reassignments that spread an organization's mentees evenly.
+
+    Every mentor ends up with ``n // m`` or ``n // m + 1`` mentees. Mentors
+    that already have the most keep the extra places, and mentees only move
+    off a mentor that is over its target, so as few mentees as possible move.
+    Unassigned mentees, mentees of mentors outside the organization and all
+    mentees of ``exclude_mentors`` are always (re)assigned.
+
+    Returns:
+        (mentors by id with users loaded, list of (mentee id, mentee username,
+        old mentor id or None, new mentor id)). No moves if there are no mentors.
+    """
+    excluded = {getattr(mentor, 'pk', mentor) for mentor in exclude_mentors}
+    mentors = {
+        mentor.pk: mentor
+        for mentor in organization.get_mentors().exclude(pk__in=excluded).select_related('user').order_by('id')
+    }
+    if not mentors:
+        return mentors, []
+
+    active = MentorAssignment.objects.filter(mentee=OuterRef('pk'), is_active=True)
+    mentees = organization.get_mentees().annotate(
+        current_mentor_id=Subquery(active.values('mentor_id')[:1]),
+        assigned_at=Subquery(active.values('assigned_at')[:1])
+    ).order_by('assigned_at', 'id').values_list('id', 'user__username', 'current_mentor_id')
+
+    # Each mentor's mentees in the order they were assigned to it
+    current = defaultdict(list)
+    to_place = []
+    for mentee_id, username, mentor_id in mentees:
+        if mentor_id in mentors:
+            current[mentor_id].append((mentee_id, username))
+        else:
+            to_place.append((mentee_id, username, mentor_id))
+
+    total = len(to_place) + sum(len(assigned) for assigned in current.values())
+    base, extra = divmod(total, len(mentors))
+    by_load = sorted(mentors, key=lambda pk: (-len(current[pk]), pk))
+    targets = {pk: base + (1 if i < extra else 0) for i, pk in enumerate(by_load)}
+
+    # Overloaded mentors give up the mentees who joined last
+    for pk, assigned in current.items():
+        for mentee_id, username in assigned[targets[pk]:]:
+            to_place.append((mentee_id, username, pk))
+
+    # Fill the mentors with the most free places first
+    free = [(len(current[pk]) - targets[pk], pk) for pk in mentors if len(current[pk]) < targets[pk]]
+    heapq.heapify(free)
+    moves = []
+    for mentee_id, username, old_mentor_id in to_place:
+        deficit, pk = heapq.heappop(free)
+        moves.append((mentee_id, username, old_mentor_id, pk))
+        if deficit + 1 < 0:
+            heapq.heappush(free, (deficit + 1, pk))
+    return mentors, moves
+
+
+def rebalance_mentees(organization, exclude_mentors=(), assigned_by=None, notes='Rebalanced by administrator'):
+    """
+    Spread an organization's mentees evenly over its mentors in one transaction.
+
+    Moved mentees' assignments are deactivated with one UPDATE and replaced
+    with one bulk INSERT, and every mentor who gained or lost mentees gets a
+    single digest notification once the transaction has committed.
+
+    Args:
+        organization: Organization to rebalance
+        exclude_mentors: Mentor profiles (or ids) being offboarded; they keep no mentees
+        assigned_by: User recorded on the new assignments
+        notes: Notes stored on the new assignments
+
+    Returns:
+        The list of new MentorAssignments
+    """
+    with transaction.atomic():
+        lock_organization(organization)
+        mentors, moves = plan_rebalance(organization, exclude_mentors)
+        if not moves:
+            return []
+
+        MentorAssignment.objects.filter(
+            mentee_id__in=[mentee_id for mentee_id, _, _, _ in moves], is_active=True
+        ).update(is_active=False)
+        assignments = MentorAssignment.objects.bulk_create([
+            MentorAssignment(mentee_id=mentee_id, mentor_id=new_mentor_id, assigned_by=assigned_by, notes=notes)
+            for mentee_id, _, _, new_mentor_id in moves
+        ])
+
+        gained, lost = defaultdict(list), defaultdict(list)
+        for _, username, old_mentor_id, new_mentor_id in moves:
+            gained[new_mentor_id].append(username)
+            if old_mentor_id is not None:
+                lost[old_mentor_id].append(username)
+        invalidate_mentee_user_ids([*gained, *lost])
+
+        old_mentors = UserProfile.objects.filter(
+            pk__in=[pk for pk in lost if pk not in mentors]
+        ).select_related('user')
+        recipients = {**{mentor.pk: mentor for mentor in old_mentors}, **mentors}
+
+        digests = []
+        for pk in sorted(gained.keys() | lost.keys()):
+            mentor = recipients[pk]
+            if not (mentor.email_notifications_enabled and mentor.user.email):
+                continue
+            lines = []
+            if gained[pk]:
+                lines.append('New mentees: ' + ', '.join(sorted(gained[pk])))
+            if lost[pk]:
+                lines.append('Reassigned to another mentor: ' + ', '.join(sorted(lost[pk])))
+            digests.append(Notification(
+                recipient=mentor.user,
+                notification_type='email',
+                trigger_event='mentor_assigned',
+                subject=f'Your mentees in {organization.name} have changed',
+                message=f'Hi {mentor.user.first_name or mentor.user.username},\n\n'
+                        f'Mentees in {organization.name} were rebalanced across mentors.\n\n'
+                        + '\n'.join(lines) +
+                        '\n\nBest regards,\nMentorship Platform Team'
+            ))
+        # Sent after commit, so the organization lock is not held while mailing
+        transaction.on_commit(lambda: NotificationService.send_bulk_email(digests))
+        return assignments
+
+
+def offboard_mentors(mentors, assigned_by=None):
+    """
+    Remove mentors from their organizations, moving all of their mentees to
+    the remaining mentors (one rebalance per organization).
+
+    Returns:
+        Number of mentees reassigned
+    """
+    by_organization = defaultdict(list)
+    for mentor in mentors:
+        if mentor.organization_id is not None:
+            by_organization[mentor.organization_id].append(mentor.pk)
+
+    moved = 0
+    with transaction.atomic():
+        for organization in Organization.objects.filter(pk__in=by_organization):
+            mentor_ids = by_organization[organization.pk]
+            moved += len(rebalance_mentees(
+                organization, exclude_mentors=mentor_ids, assigned_by=assigned_by, notes='Mentor offboarded'
+            ))
+            # Mentees left behind when no other mentor exists are unassigned
+            MentorAssignment.objects.filter(mentor_id__in=mentor_ids, is_active=True).update(is_active=False)
+            UserProfile.objects.filter(pk__in=mentor_ids).update(organization=None)
+            invalidate_mentee_user_ids(mentor_ids)
+    return moved
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, MentorAssignment
+from .services import invalidate_mentee_user_ids
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -10,4 +11,43 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+    # Only persist a profile that was loaded through this user and changed;
+    # plain User saves such as the last_login update must not touch it
+    if not User.profile.related.is_cached(instance):
+        return
+    profile = instance.profile
+    if profile.pk is None:
+        profile.save()
+        return
+    dirty_fields = profile.get_dirty_fields()
+    if dirty_fields:
+        profile.save(update_fields=dirty_fields)
+
+@receiver(post_save, sender=MentorAssignment)
+@receiver(post_delete, sender=MentorAssignment)
+def invalidate_assignment_mentees(sender, instance, **kwargs):
+    invalidate_mentee_user_ids([
+        instance.mentor_id,
+        getattr(instance, '_loaded_mentor_id', None),
+        *getattr(instance, '_deactivated_mentor_ids', ()),
+    ])
+
+@receiver(pre_save, sender=UserProfile)
+def track_organization_change(sender, instance, update_fields=None, **kwargs):
+    instance._organization_changed = (
+        instance.pk is not None
+        and (update_fields is None or 'organization' in update_fields)
+        and 'organization' in instance.get_dirty_fields()
+    )
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_organization_mentees(sender, instance, **kwargs):
+    # Mentee sets only include mentees in the mentor's organization
+    if not instance._organization_changed:
+        return
+    if instance.role == 'mentor':
+        invalidate_mentee_user_ids([instance.pk])
+    else:
+        invalidate_mentee_user_ids(MentorAssignment.objects.filter(
+            mentee=instance, is_active=True
+        ).values_list('mentor_id', flat=True))
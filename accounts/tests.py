@@ -1,3 +1,430 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Organization, MentorAssignment, UserProfile
+from mentorship_platform.testing import make_profile
+from notifications.models import Notification
+from .services import assign_least_loaded_mentor, mentee_user_ids, offboard_mentors, rebalance_mentees
+
+
+class MentorAssignmentServiceTests(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Academy')
+        self.mentors = [make_profile(f'mentor{i}', 'mentor', self.organization) for i in range(3)]
+
+    def test_assigns_least_loaded_mentor_with_fixed_queries(self):
+        for i in range(4):
+            assign_least_loaded_mentor(make_profile(f'early{i}', 'mentee', self.organization), self.organization)
+        mentee = make_profile('mentee', 'mentee', self.organization)
+
+        # Independent of the number of mentors and mentees
+        with self.assertNumQueries(6):
+            assignment = assign_least_loaded_mentor(mentee, self.organization, notes='Auto-assigned')
+
+        # 4 earlier mentees went 2/1/1, so the new one goes to a mentor with 1
+        self.assertEqual(assignment.mentor.get_mentees().count(), 2)
+        loads = Counter(MentorAssignment.objects.filter(is_active=True).values_list('mentor_id', flat=True))
+        self.assertEqual(sorted(loads.values()), [1, 2, 2])
+
+    def test_no_mentors(self):
+        other = Organization.objects.create(name='Empty')
+        mentee = make_profile('lonely', 'mentee', other)
+        self.assertIsNone(assign_least_loaded_mentor(mentee, other))
+
+    def test_inactive_assignments_do_not_count(self):
+        busy = self.mentors[0]
+        for i in range(3):
+            MentorAssignment.objects.create(
+                mentee=make_profile(f'former{i}', 'mentee', self.organization), mentor=busy, is_active=False
+            )
+        assignment = assign_least_loaded_mentor(make_profile('new', 'mentee', self.organization), self.organization)
+        self.assertEqual(assignment.mentor, busy)
+
+
+@tag('concurrency')
+class ConcurrentJoinTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Needs a file database on SQLite: SQLITE_TEST_DATABASE=test_db.sqlite3 '
+                          'python manage.py test --tag concurrency')
+
+    def test_parallel_joins_are_balanced(self):
+        organization = Organization.objects.create(name='Academy')
+        for i in range(4):
+            make_profile(f'mentor{i}', 'mentor', organization)
+        mentees = [make_profile(f'mentee{i}', 'mentee', organization) for i in range(20)]
+
+        barrier = threading.Barrier(len(mentees))
+        errors = []
+
+        def join(mentee):
+            try:
+                barrier.wait()
+                assign_least_loaded_mentor(mentee, organization)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=join, args=(mentee,)) for mentee in mentees]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        loads = Counter(MentorAssignment.objects.filter(is_active=True).values_list('mentor_id', flat=True))
+        self.assertEqual(sorted(loads.values()), [5, 5, 5, 5])
+
+
+class ProfileSignalTests(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Academy')
+        self.profile = make_profile('member', 'mentee', self.organization)
+
+    def test_login_does_not_write_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('accounts:login'), {'username': 'member', 'password': 'pw'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries
+                          if q['sql'].startswith('UPDATE "accounts_userprofile"')])
+
+    def test_unloaded_profile_is_not_saved(self):
+        user = User.objects.get(username='member')
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_only_changed_fields_are_saved(self):
+        user = User.objects.select_related('profile').get(username='member')
+        user.profile.bio = 'Hello'
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "accounts_userprofile"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"role"', updates[0])
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).bio, 'Hello')
+
+        # Saved values are the new baseline
+        with self.assertNumQueries(1):
+            user.save()
+
+
+class IdentityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.create(name='Academy')
+        self.mentor = make_profile('mentor', 'mentor', self.organization)
+        self.mentees = [make_profile(f'mentee{i}', 'mentee', self.organization) for i in range(3)]
+        for mentee in self.mentees:
+            MentorAssignment.objects.create(mentee=mentee, mentor=self.mentor)
+
+    def test_identity_is_loaded_once_per_request(self):
+        self.client.login(username='mentee0', password='pw')
+        response = self.client.get(reverse('accounts:organization_detail', args=[self.organization.id]))
+        identity = response.wsgi_request.identity
+        self.assertEqual(identity.current_mentor, self.mentor)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(identity.current_mentor.user.username, 'mentor')
+            self.assertEqual(identity.organization, self.organization)
+            self.assertIs(response.wsgi_request.user.profile, identity.profile)
+
+    def test_mentee_user_ids(self):
+        self.client.login(username='mentor', password='pw')
+        response = self.client.get(reverse('accounts:mentor_dashboard'))
+        identity = response.wsgi_request.identity
+        self.assertEqual(identity.mentee_user_ids, {mentee.user_id for mentee in self.mentees})
+        with self.assertNumQueries(0):
+            self.assertTrue(identity.is_mentor_of(self.mentees[0].user))
+            self.assertFalse(identity.is_mentor_of(self.mentor.user_id))
+
+
+class MenteeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.create(name='Academy')
+        self.mentor = make_profile('mentor', 'mentor', self.organization)
+        self.other_mentor = make_profile('other', 'mentor', self.organization)
+        self.mentee = make_profile('mentee', 'mentee', self.organization)
+        self.assignment = MentorAssignment.objects.create(mentee=self.mentee, mentor=self.mentor)
+
+    def test_cached_after_first_lookup(self):
+        self.assertEqual(mentee_user_ids(self.mentor.pk), {self.mentee.user_id})
+        with self.assertNumQueries(0):
+            self.assertEqual(mentee_user_ids(self.mentor.pk), {self.mentee.user_id})
+
+    def test_reassignment_invalidates_both_mentors(self):
+        mentee_user_ids(self.mentor.pk)
+        mentee_user_ids(self.other_mentor.pk)
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=self.other_mentor)
+        self.assertEqual(mentee_user_ids(self.mentor.pk), set())
+        self.assertEqual(mentee_user_ids(self.other_mentor.pk), {self.mentee.user_id})
+
+    def test_changing_assignment_mentor_invalidates_previous_mentor(self):
+        mentee_user_ids(self.mentor.pk)
+        assignment = MentorAssignment.objects.get(pk=self.assignment.pk)
+        assignment.mentor = self.other_mentor
+        assignment.save()
+        self.assertEqual(mentee_user_ids(self.mentor.pk), set())
+
+    def test_delete_invalidates(self):
+        mentee_user_ids(self.mentor.pk)
+        self.assignment.delete()
+        self.assertEqual(mentee_user_ids(self.mentor.pk), set())
+
+    def test_leaving_organization_invalidates(self):
+        mentee_user_ids(self.mentor.pk)
+        profile = UserProfile.objects.get(pk=self.mentee.pk)
+        profile.organization = Organization.objects.create(name='Elsewhere')
+        profile.save()
+        self.assertEqual(mentee_user_ids(self.mentor.pk), set())
+
+    def test_unrelated_profile_change_keeps_cache(self):
+        mentee_user_ids(self.mentor.pk)
+        profile = UserProfile.objects.get(pk=self.mentee.pk)
+        profile.bio = 'Hello'
+        profile.save()
+        with self.assertNumQueries(0):
+            mentee_user_ids(self.mentor.pk)
+
+
+class OrganizationRosterTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pw')
+        self.organization = Organization.objects.create(name='Academy', created_by=self.admin)
+        self.admin.profile.role = 'mentor'
+        self.admin.profile.organization = self.organization
+        self.admin.profile.save()
+        self.mentors = [make_profile(f'mentor{i}', 'mentor', self.organization) for i in range(2)]
+        self.url = reverse('accounts:organization_detail', args=[self.organization.id])
+        self.client.login(username='admin', password='pw')
+
+    def add_mentees(self, start, count):
+        for i in range(start, start + count):
+            mentee = make_profile(f'mentee{i:03}', 'mentee', self.organization)
+            MentorAssignment.objects.create(mentee=mentee, mentor=self.mentors[i % 2])
+
+    def render_roster(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_roster(self):
+        self.add_mentees(0, 3)
+        _, small = self.render_roster()
+        self.add_mentees(3, 12)
+        response, large = self.render_roster()
+        self.assertEqual(small, large)
+        self.assertContains(response, 'Mentor: mentor1')
+        counts = {mentor.user.username: mentor.active_mentee_count for mentor in response.context['mentors']}
+        self.assertEqual(counts, {'admin': 0, 'mentor0': 8, 'mentor1': 7})
+
+    def test_pagination_and_search(self):
+        self.add_mentees(0, 60)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['mentees']), 50)
+        self.assertEqual(response.context['page_obj'].paginator.count, 60)
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(len(response.context['mentees']), 10)
+
+        response = self.client.get(self.url, {'q': 'mentee05'})
+        self.assertEqual([m.user.username for m in response.context['mentees']],
+                         [f'mentee{i:03}' for i in range(50, 60)])
+        self.assertEqual(response.context['mentors'], [])
+
+
+class ImportMembersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.create(name='Academy')
+        self.busy = make_profile('busy', 'mentor', self.organization)
+        self.free = make_profile('free', 'mentor', self.organization)
+        MentorAssignment.objects.create(mentee=make_profile('taken', 'mentee', self.organization), mentor=self.busy)
+
+    def run_import(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as f:
+            writer = csv.DictWriter(f, fieldnames=['username', 'email', 'role', 'password'])
+            writer.writeheader()
+            writer.writerows(rows)
+        return self.call_import(f.name)
+
+    def run_jsonl_import(self, lines):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('\n'.join(lines) + '\n')
+        return self.call_import(f.name)
+
+    def call_import(self, path):
+        self.addCleanup(os.remove, path)
+        out, err = StringIO(), StringIO()
+        call_command('import_members', path, organization=self.organization.join_code,
+                     workers=1, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_new_rows_and_balances_mentees(self):
+        # Both mentor sets are cached before the import
+        self.assertEqual(len(mentee_user_ids(self.busy.pk)), 1)
+        self.assertEqual(mentee_user_ids(self.free.pk), frozenset())
+
+        out, err = self.run_import([
+            {'username': 'ann', 'email': 'ann@example.com', 'role': 'mentee', 'password': 'secret-pw'},
+            {'username': 'bob', 'role': 'mentee'},
+            {'username': 'taken', 'role': 'mentee'},
+            {'username': '', 'role': 'mentee'},
+            {'username': 'eve', 'role': 'admin'},
+            {'username': 'cat', 'role': 'mentee'},
+        ])
+
+        self.assertIn('Imported 3 member(s)', out)
+        self.assertIn('3 mentee(s) assigned, 1 existing username(s) skipped, 2 invalid row(s)', out)
+        self.assertIn('Row 5: missing username', err)
+        self.assertIn("Row 6: role must be 'mentor' or 'mentee'", err)
+        self.assertFalse(User.objects.filter(username='eve').exists())
+
+        ann = User.objects.get(username='ann')
+        self.assertTrue(ann.check_password('secret-pw'))
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertEqual(ann.profile.organization, self.organization)
+
+        # Loads 1/0 before: two new mentees go to the free mentor, one to the busy one
+        new = {'ann', 'bob', 'cat'}
+        busy_new = {user.username for user in User.objects.filter(pk__in=mentee_user_ids(self.busy.pk))} & new
+        free_new = {user.username for user in User.objects.filter(pk__in=mentee_user_ids(self.free.pk))}
+        self.assertEqual((len(busy_new), len(free_new)), (1, 2))
+        self.assertEqual(busy_new | free_new, new)
+
+
+    def test_jsonl_reports_malformed_lines_by_line_number(self):
+        out, err = self.run_jsonl_import([
+            '{"username": "ann", "role": "mentee"}',
+            '{"username": "bob", "role": ',
+            '',
+            '["cat", "mentee"]',
+            '{"username": "dan", "role": "admin"}',
+            '{"username": "eve", "role": "mentee"}',
+        ])
+
+        self.assertIn('Imported 2 member(s)', out)
+        self.assertIn('3 invalid row(s)', out)
+        self.assertIn('Row 2: invalid JSON', err)
+        self.assertIn('Row 4: not a JSON object', err)
+        self.assertIn("Row 5: role must be 'mentor' or 'mentee'", err)
+        self.assertEqual(
+            set(User.objects.filter(username__in=['ann', 'eve']).values_list('username', flat=True)),
+            {'ann', 'eve'}
+        )
+
+    def test_existing_usernames_are_not_hashed(self):
+        command = 'accounts.management.commands.import_members'
+        with mock.patch(f'{command}.ProcessPoolExecutor', ThreadPoolExecutor), \
+                mock.patch(f'{command}.make_password', wraps=make_password) as hash_password:
+            out, _ = self.run_import([
+                {'username': 'taken', 'role': 'mentee', 'password': 'taken-pw'},
+                {'username': 'ann', 'role': 'mentee', 'password': 'ann-pw'},
+                {'username': 'ann', 'role': 'mentee', 'password': 'repeated-pw'},
+            ])
+
+        self.assertIn('Imported 1 member(s)', out)
+        self.assertIn('2 existing username(s) skipped', out)
+        self.assertEqual([call.args[0] for call in hash_password.call_args_list], ['ann-pw'])
+        self.assertTrue(User.objects.get(username='ann').check_password('ann-pw'))
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.login(username='root', password='pw')
+
+    def add_organization(self, name):
+        organization = Organization.objects.create(name=name)
+        mentor = make_profile(f'{name}-mentor', 'mentor', organization)
+        MentorAssignment.objects.create(mentee=make_profile(f'{name}-mentee', 'mentee', organization), mentor=mentor)
+
+    def test_changelists_use_fixed_queries(self):
+        # Sorted by the annotated mentor count and current mentor columns
+        urls = [
+            reverse('admin:accounts_organization_changelist') + '?o=-4',
+            reverse('admin:accounts_userprofile_changelist') + '?o=5',
+            reverse('admin:accounts_mentorassignment_changelist'),
+        ]
+        self.add_organization('first')
+        counts = []
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            counts.append(len(ctx.captured_queries))
+
+        for i in range(3):
+            self.add_organization(f'more{i}')
+        for url, count in zip(urls, counts):
+            with self.assertNumQueries(count):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class RebalanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.create(name='Academy')
+        self.mentors = [make_profile(f'mentor{i}', 'mentor', self.organization) for i in range(3)]
+        self.mentees = [make_profile(f'mentee{i}', 'mentee', self.organization) for i in range(9)]
+        for mentee in self.mentees[:7]:
+            MentorAssignment.objects.create(mentee=mentee, mentor=self.mentors[0])
+
+    def loads(self):
+        return Counter(MentorAssignment.objects.filter(is_active=True).values_list('mentor__user__username', flat=True))
+
+    def test_rebalance_moves_as_few_mentees_as_possible(self):
+        mentee_user_ids(self.mentors[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            assignments = rebalance_mentees(self.organization)
+
+        # mentor0 keeps 3 of its 7, the other 4 and the 2 unassigned move
+        self.assertEqual(len(assignments), 6)
+        self.assertEqual(self.loads(), {'mentor0': 3, 'mentor1': 3, 'mentor2': 3})
+        self.assertEqual(len(mentee_user_ids(self.mentors[0].pk)), 3)
+        self.assertEqual(
+            sorted(Notification.objects.filter(trigger_event='mentor_assigned').values_list('recipient__username', flat=True)),
+            ['mentor0', 'mentor1', 'mentor2']
+        )
+
+        # Already balanced: nothing moves and nobody is notified again
+        self.assertEqual(rebalance_mentees(self.organization), [])
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_mentors_keep_their_longest_standing_mentees(self):
+        MentorAssignment.objects.filter(mentee=self.mentees[6]).update(
+            assigned_at=timezone.now() - timedelta(days=30)
+        )
+        rebalance_mentees(self.organization)
+        kept = MentorAssignment.objects.filter(mentor=self.mentors[0], is_active=True)
+        self.assertEqual({a.mentee for a in kept}, {self.mentees[6], self.mentees[0], self.mentees[1]})
+
+    def test_digests_are_sent_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            rebalance_mentees(self.organization)
+            self.assertFalse(Notification.objects.exists())
+        callbacks[-1]()
+        self.assertEqual(Notification.objects.filter(trigger_event='mentor_assigned').count(), 3)
+
+    def test_offboard_reassigns_all_mentees(self):
+        moved = offboard_mentors([self.mentors[0]])
+        self.assertEqual(moved, 9)
+        self.assertEqual(sorted(self.loads().values()), [4, 5])
+        self.assertNotIn('mentor0', self.loads())
+        self.assertIsNone(UserProfile.objects.get(pk=self.mentors[0].pk).organization)
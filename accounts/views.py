@@ -1,10 +1,22 @@
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from reports.models import DailyEngagement
+from reports.services import engagement_by, engagement_stats
 from .models import UserProfile, Organization, MentorAssignment
 from .forms import RegistrationForm, OrganizationForm, MentorAssignmentForm
+from .services import assign_least_loaded_mentor, mentors_by_load
+
+ROSTER_PAGE_SIZE = 50
+# Dashboards summarize the last four weeks of engagement rollups
+ENGAGEMENT_WINDOW_DAYS = 28
 
 
 def register_view(request):
@@ -28,24 +40,8 @@ def register_view(request):
                     user.profile.role = 'mentee'
                     user.profile.save()
 
-                    # Assign to a mentor automatically if available
-                    available_mentors = organization.get_mentors()
-                    if available_mentors.exists():
-                        # Simple round-robin: assign to mentor with fewest mentees
-                        mentors_with_count = []
-                        for mentor in available_mentors:
-                            mentee_count = mentor.get_mentees().count()
-                            mentors_with_count.append((mentor, mentee_count))
-
-                        # Sort by mentee count and assign to the one with fewest
-                        mentors_with_count.sort(key=lambda x: x[1])
-                        assigned_mentor = mentors_with_count[0][0]
-
-                        MentorAssignment.objects.create(
-                            mentee=user.profile,
-                            mentor=assigned_mentor,
-                            notes="Auto-assigned on registration"
-                        )
+                    # Assign to the least-loaded mentor automatically if available
+                    assign_least_loaded_mentor(user.profile, organization, notes="Auto-assigned on registration")
 
                     messages.success(request, f'Successfully joined {organization.name}!')
                 except Organization.DoesNotExist:
@@ -81,12 +77,15 @@ def register_view(request):
 @login_required
 def profile_view(request):
     """View user profile with organization info."""
+    identity = request.identity
     context = {
-        'user_profile': request.user.profile
+        'user_profile': identity.profile
     }
 
-    if request.user.profile.role == 'mentee':
-        context['current_mentor'] = request.user.profile.get_current_mentor()
+    if identity.is_mentee:
+        context['current_mentor'] = identity.current_mentor
+    elif identity.is_mentor:
+        context['mentees'] = identity.profile.get_mentees().select_related('user')
 
     return render(request, 'accounts/profile.html', context)
 
@@ -94,20 +93,29 @@ def profile_view(request):
 @login_required
 def mentor_dashboard_view(request):
     """Mentor dashboard showing assigned mentees."""
-    if request.user.profile.role != 'mentor':
+    identity = request.identity
+    if not identity.is_mentor:
         messages.error(request, 'Access restricted to mentors.')
         return redirect('accounts:profile')
 
-    if not request.user.profile.organization:
+    if not identity.organization:
         messages.warning(request, 'You are not assigned to any organization.')
         return redirect('accounts:profile')
 
-    mentees = request.user.profile.get_mentees()
-    organization = request.user.profile.organization
+    mentees = list(identity.profile.get_mentees().select_related('user'))
+    organization = identity.organization
+
+    engagement = DailyEngagement.objects.filter(mentor=request.user, date__gte=_engagement_since())
+    by_mentee = {stats['mentee']: stats for stats in engagement_by(engagement, 'mentee')}
+    for mentee in mentees:
+        mentee.engagement = by_mentee.get(mentee.user_id)
 
     context = {
         'mentees': mentees,
-        'organization': organization
+        'organization': organization,
+        'engagement': engagement_stats(engagement),
+        'weekly_engagement': engagement_by(engagement, 'week'),
+        'engagement_days': ENGAGEMENT_WINDOW_DAYS
     }
     return render(request, 'accounts/mentor_dashboard.html', context)
 
@@ -115,15 +123,20 @@ def mentor_dashboard_view(request):
 @login_required
 def mentee_dashboard_view(request):
     """Mentee dashboard showing current mentor."""
-    if request.user.profile.role != 'mentee':
+    identity = request.identity
+    if not identity.is_mentee:
         return redirect('accounts:profile')
 
-    current_mentor = request.user.profile.get_current_mentor()
-    organization = request.user.profile.organization
+    current_mentor = identity.current_mentor
+    organization = identity.organization
 
     context = {
         'mentor': current_mentor,
-        'organization': organization
+        'organization': organization,
+        'engagement': engagement_stats(
+            DailyEngagement.objects.filter(mentee=request.user, date__gte=_engagement_since())
+        ),
+        'engagement_days': ENGAGEMENT_WINDOW_DAYS
     }
     return render(request, 'accounts/mentee_dashboard.html', context)
 
@@ -139,9 +152,10 @@ def organization_create_view(request):
             organization.save()
 
             # Add creator as a mentor in the organization
-            request.user.profile.organization = organization
-            request.user.profile.role = 'mentor'
-            request.user.profile.save()
+            profile = request.identity.profile
+            profile.organization = organization
+            profile.role = 'mentor'
+            profile.save()
 
             messages.success(request, f'Organization "{organization.name}" created successfully!')
             messages.info(request, f'Your organization join code is: {organization.join_code}')
@@ -156,17 +170,30 @@ def organization_create_view(request):
 def organization_detail_view(request, org_id):
     """View organization details and manage mentors/mentees."""
     organization = get_object_or_404(Organization, id=org_id)
+    identity = request.identity
 
     # Check if user belongs to this organization
-    if request.user.profile.organization != organization:
+    if identity.organization != organization:
         messages.error(request, 'You do not have permission to view this organization.')
         return redirect('accounts:profile')
 
-    is_admin = organization.created_by == request.user or request.user.is_superuser
-    is_mentee = request.user.profile.role == 'mentee'
-    is_mentor = request.user.profile.role == 'mentor'
+    is_admin = organization.created_by_id == request.user.id or request.user.is_superuser
+    is_mentee = identity.is_mentee
+    is_mentor = identity.is_mentor
+
+    # The roster is built with a fixed number of queries however large the
+    # organization is: mentee counts are annotated and each mentee's active
+    # assignment is prefetched with its mentor and user
+    query = request.GET.get('q', '').strip()
+    search = Q()
+    if query:
+        search = (Q(user__username__icontains=query) | Q(user__first_name__icontains=query) |
+                  Q(user__last_name__icontains=query) | Q(user__email__icontains=query))
 
-    mentors = organization.get_mentors()
+    mentors = []
+    if is_mentor or is_admin:
+        mentors = list(mentors_by_load(organization).filter(search).select_related('user')
+                       .order_by('user__username'))
 
     # Filter mentees based on user role
     if is_mentee:
@@ -174,23 +201,41 @@ def organization_detail_view(request, org_id):
         mentees = organization.get_mentees().filter(user=request.user)
     else:
         # Mentors and admins see all mentees
-        mentees = organization.get_mentees()
+        mentees = organization.get_mentees().filter(search)
+
+    mentees = mentees.select_related('user').prefetch_related(Prefetch(
+        'mentee_assignments',
+        queryset=MentorAssignment.objects.filter(is_active=True).select_related('mentor__user'),
+        to_attr='active_assignments'
+    )).order_by('user__username')
+    page = Paginator(mentees, ROSTER_PAGE_SIZE).get_page(request.GET.get('page'))
 
     context = {
         'organization': organization,
         'mentors': mentors,
-        'mentees': mentees,
+        'mentees': page,
+        'page_obj': page,
+        'query': query,
         'is_admin': is_admin,
         'is_mentee': is_mentee,
         'is_mentor': is_mentor
     }
+    if is_mentor or is_admin:
+        context['engagement'] = engagement_stats(
+            DailyEngagement.objects.filter(organization=organization, date__gte=_engagement_since())
+        )
+        context['engagement_days'] = ENGAGEMENT_WINDOW_DAYS
     return render(request, 'accounts/organization_detail.html', context)
 
 
+def _engagement_since():
+    return timezone.now().date() - timedelta(days=ENGAGEMENT_WINDOW_DAYS - 1)
+
+
 @login_required
 def organization_join_view(request):
     """Join an organization using a code."""
-    if request.user.profile.organization:
+    if request.identity.organization:
         messages.warning(request, 'You are already a member of an organization.')
         return redirect('accounts:profile')
 
@@ -198,32 +243,22 @@ def organization_join_view(request):
         join_code = request.POST.get('join_code', '').strip().upper()
         try:
             organization = Organization.objects.get(join_code=join_code, is_active=True)
+            profile = request.identity.profile
 
-            if request.user.profile.role == 'mentor':
-                request.user.profile.organization = organization
-                request.user.profile.save()
+            if request.identity.is_mentor:
+                profile.organization = organization
+                profile.save()
                 messages.success(request, f'Joined {organization.name} as a mentor!')
             else:
                 # Assign to a mentor
-                request.user.profile.organization = organization
-                request.user.profile.save()
-
-                available_mentors = organization.get_mentors()
-                if available_mentors.exists():
-                    mentors_with_count = []
-                    for mentor in available_mentors:
-                        mentee_count = mentor.get_mentees().count()
-                        mentors_with_count.append((mentor, mentee_count))
-
-                    mentors_with_count.sort(key=lambda x: x[1])
-                    assigned_mentor = mentors_with_count[0][0]
-
-                    MentorAssignment.objects.create(
-                        mentee=request.user.profile,
-                        mentor=assigned_mentor,
-                        notes="Auto-assigned on joining organization"
-                    )
-                    messages.success(request, f'Joined {organization.name} and assigned to {assigned_mentor.user.username}!')
+                profile.organization = organization
+                profile.save()
+
+                assignment = assign_least_loaded_mentor(
+                    profile, organization, notes="Auto-assigned on joining organization"
+                )
+                if assignment:
+                    messages.success(request, f'Joined {organization.name} and assigned to {assignment.mentor.user.username}!')
                 else:
                     messages.warning(request, f'Joined {organization.name}, but no mentors available yet.')
 
@@ -0,0 +1,142 @@
+"""
+Admin changelists for very large tables.
+
+``LargeTableAdmin`` pages through the default ordering with keyset cursors
+("Older" links) instead of OFFSET, and counts rows with
+``ApproximateCountPaginator``. Sorting by another column falls back to the
+regular numbered pages, still with the capped count. ``DateDrilldownFilter``
+browses by year, month and day without date_hierarchy's table scans.
+"""
+import calendar
+import datetime
+
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.formats import date_format
+
+from .pagination import ApproximateCountPaginator, keyset_paginate
+
+CURSOR_VAR = 'cursor'
+
+
+class KeysetChangeList(ChangeList):
+    def __init__(self, request, *args, **kwargs):
+        # get_results() runs inside ChangeList.__init__
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.next_cursor = None
+        self.keyset = ORDER_VAR not in request.GET
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Sorting and filter links always start again from the newest rows
+        return super().get_query_string({CURSOR_VAR: None, **(new_params or {})}, remove)
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_list, self.next_cursor = keyset_paginate(
+            self.queryset, self.model_admin.ordering, cursor=self.cursor, page_size=self.list_per_page
+        )
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.next_cursor)
+        self.paginator = paginator
+
+    @property
+    def next_page_url(self):
+        if self.next_cursor:
+            return self.get_query_string({CURSOR_VAR: self.next_cursor})
+        return None
+
+
+class DateDrilldownFilter(admin.DateFieldListFilter):
+    """
+    The fixed date ranges plus year, month and day links to drill into.
+
+    Every link is a half-open range on the field, so it is answered from an
+    index on the date. The year list needs only the oldest value (one index
+    lookup) instead of date_hierarchy's DISTINCT query over the table.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        since, until = (self._parse(self.date_params.get(key))
+                        for key in (self.lookup_kwarg_since, self.lookup_kwarg_until))
+
+        if since and until and (since.month, since.day) == (1, 1) and until == since.replace(year=since.year + 1):
+            self.links += tuple(self._month_link(since.replace(month=month)) for month in range(1, 13))
+        elif since and until and since.day == 1 and until == self._next_month(since):
+            self.links += self._day_links(since)
+        elif since and until and until - since == datetime.timedelta(days=1):
+            self.links += self._day_links(since.replace(day=1))
+        else:
+            oldest = model._default_manager.filter(**{f'{field_path}__isnull': False}).order_by(
+                field_path).values_list(field_path, flat=True).first()
+            if oldest is not None:
+                if isinstance(oldest, datetime.datetime):
+                    oldest = timezone.localtime(oldest) if timezone.is_aware(oldest) else oldest
+                self.links += tuple(
+                    (str(year), self._range(datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)))
+                    for year in range(timezone.localdate().year, oldest.year - 1, -1)
+                )
+
+    @staticmethod
+    def _parse(value):
+        if not value:
+            return None
+        parsed = parse_datetime(value) or parse_date(value)
+        return parsed.date() if isinstance(parsed, datetime.datetime) else parsed
+
+    @staticmethod
+    def _next_month(day):
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+    def _bound(self, day):
+        if not isinstance(self.field, models.DateTimeField):
+            return day
+        bound = datetime.datetime.combine(day, datetime.time.min)
+        return timezone.make_aware(bound) if timezone.is_aware(timezone.now()) else bound
+
+    def _range(self, since, until):
+        return {self.lookup_kwarg_since: self._bound(since), self.lookup_kwarg_until: self._bound(until)}
+
+    def _month_link(self, first):
+        return date_format(first, 'YEAR_MONTH_FORMAT'), self._range(first, self._next_month(first))
+
+    def _day_links(self, first):
+        links = [self._month_link(first)]
+        for day in range(1, calendar.monthrange(first.year, first.month)[1] + 1):
+            date = first.replace(day=day)
+            links.append((date_format(date, 'MONTH_DAY_FORMAT'), self._range(date, date + datetime.timedelta(days=1))))
+        return tuple(links)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for tables too large to count or OFFSET through.
+
+    ``ordering`` must end with a unique field (e.g. ``['-created_at', '-id']``)
+    so keyset cursors are unambiguous. Browse dates with ``DateDrilldownFilter``
+    in ``list_filter`` rather than ``date_hierarchy``, whose drilldown scans
+    the table for distinct dates.
+    """
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    change_list_template = 'admin/large_table_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,38 @@
+"""Query-string parsing shared by the filterable list views."""
+from django.utils.dateparse import parse_date
+
+
+def date_param(params, name):
+    """A YYYY-MM-DD query parameter as a date, or None when missing or invalid."""
+    try:
+        return parse_date(params.get(name, ''))
+    except ValueError:
+        return None
+
+
+def int_param(params, name, choices=None):
+    """An integer query parameter, or None when missing, invalid or not in ``choices``."""
+    try:
+        value = int(params.get(name, ''))
+    except ValueError:
+        return None
+    if choices is not None and value not in choices:
+        return None
+    return value
+
+
+def date_range(params):
+    """
+    Read ``date`` or ``start``/``end`` from query parameters.
+
+    Returns:
+        (start, end); either may be None for an open end. ``date`` sets both,
+        and a reversed range is swapped.
+    """
+    day = date_param(params, 'date')
+    if day:
+        return day, day
+    start, end = date_param(params, 'start'), date_param(params, 'end')
+    if start and end and start > end:
+        start, end = end, start
+    return start, end
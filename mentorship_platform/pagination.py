@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) pagination shared by the list views, and a paginator that
+avoids full-table counts for the admin.
+
+Unlike OFFSET pagination, every page is a range scan that starts right after
+the last row of the previous page, so page cost stays flat however deep the
+user browses. Cursors are opaque URL-safe strings holding the ordering values
+of the last row on a page.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator that never counts a huge table in full.
+
+    Unfiltered querysets on PostgreSQL use the planner's row estimate once it
+    exceeds ``count_cap``; everything else is counted up to ``count_cap`` rows
+    only. ``count_is_exact`` tells templates whether to show the number as is.
+    """
+    count_cap = 10000
+    count_is_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = self._estimated_rows(queryset)
+            if estimate is not None and estimate > self.count_cap:
+                self.count_is_exact = False
+                return estimate
+
+        count = queryset.order_by()[:self.count_cap + 1].count()
+        if count > self.count_cap:
+            self.count_is_exact = False
+            return self.count_cap
+        return count
+
+    @staticmethod
+    def _estimated_rows(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 means the table has never been analyzed
+        return row[0] if row and row[0] >= 0 else None
+
+
+def encode_cursor(values):
+    """Encode a sequence of ordering values (dates, datetimes, ints, strings)."""
+    raw = [v.isoformat() if isinstance(v, (datetime.date, datetime.datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    """
+    Decode a cursor back into Python values for ``fields`` of ``model``.
+
+    Returns None for a missing or malformed cursor so callers fall back to
+    the first page.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(fields):
+            return None
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, raw)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+def keyset_after(ordering, values):
+    """Q matching the rows that come after ``values`` in ``ordering``."""
+    fields = [name.lstrip('-') for name in ordering]
+    # (a, b) after (x, y)  <=>  a > x OR (a = x AND b > y), per direction
+    after = Q()
+    for i, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition = Q(**{f'{fields[i]}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            condition &= Q(**{prev_field: prev_value})
+        after |= condition
+    return after
+
+
+def keyset_paginate(queryset, ordering, cursor=None, page_size=25):
+    """
+    Return one page of ``queryset`` ordered by ``ordering``.
+
+    Args:
+        queryset: Base queryset
+        ordering: Model field names, '-' prefixed for descending, ending in a
+            unique field (usually 'id' / '-id') so the order is total
+        cursor: Cursor from a previous page, or None for the first page
+        page_size: Rows per page
+
+    Returns:
+        (list of rows, cursor for the next page or None when this is the last)
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    values = decode_cursor(cursor, queryset.model, fields)
+    if values is not None:
+        queryset = queryset.filter(keyset_after(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    opts = queryset.model._meta
+    return rows, encode_cursor([getattr(last, opts.get_field(name).attname) for name in fields])
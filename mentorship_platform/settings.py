@@ -67,6 +67,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.IdentityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -95,6 +96,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.identity',
             ],
         },
     },
@@ -116,6 +118,29 @@ DATABASES = {
     )
 }
 
+# SQLite's in-memory test database fails concurrent writers instead of making
+# them wait; set SQLITE_TEST_DATABASE (e.g. test_db.sqlite3) to test on a file
+sqlite_test_database = config('SQLITE_TEST_DATABASE', default='')
+if sqlite_test_database and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / sqlite_test_database}
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# The local-memory default is per process; with several workers point this
+# at a shared backend (e.g. django.core.cache.backends.redis.RedisCache) so
+# cache invalidations reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='mentorship-platform'),
+    }
+}
+
+# Seconds a mentor's cached mentee set is kept; it is also invalidated on change
+MENTEE_IDS_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -177,6 +202,25 @@ EMAIL_HOST_USER = 'your-email@gmail.com'
 EMAIL_HOST_PASSWORD = 'your-app-password'
 DEFAULT_FROM_EMAIL = 'MentorFlow <noreply@mentorflow.com>'
 
+# Reminder emails are sent over one SMTP connection in batches of this size
+NOTIFICATION_EMAIL_BATCH_SIZE = 100
+
+# Notification outbox: views only queue notifications and the
+# `process_outbox` worker delivers them, retrying failures with
+# exponential backoff before dead-lettering them.
+NOTIFICATION_OUTBOX_ENABLED = config('NOTIFICATION_OUTBOX_ENABLED', default=True, cast=bool)
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BASE_DELAY = 60  # seconds, doubled after every failed attempt
+NOTIFICATION_CLAIM_TIMEOUT = 300  # seconds a claimed batch is leased to one worker
+NOTIFICATION_DELIVERY_CHUNK_SIZE = 20  # results are saved and the lease renewed after each chunk
+
+# Live message delivery (server-sent events). The in-process broker only
+# reaches clients connected to the same worker process.
+NOTIFICATIONS_REALTIME_BROKER = 'notifications.realtime.InProcessBroker'
+# Under WSGI every waiting long-poll holds a worker thread; at most this many
+# wait at once per process, the rest poll on the client's retry interval
+NOTIFICATIONS_MAX_LONG_POLLS = 4
+
 # Twilio Configuration (SMS)
 TWILIO_ACCOUNT_SID = 'your_account_sid'
 TWILIO_AUTH_TOKEN = 'your_auth_token'
@@ -186,8 +230,13 @@ TWILIO_PHONE_NUMBER = '+1234567890'
 CRONJOBS = [
     ('0 8 * * *', 'notifications.cron.send_morning_reminders'),
     ('0 18 * * *', 'notifications.cron.send_evening_reminders'),
+    ('* * * * *', 'notifications.cron.process_outbox'),
+    ('30 2 * * *', 'reports.cron.reconcile_engagement'),
 ]
 
+# Days of engagement rollups the nightly job rebuilds from the raw records
+ENGAGEMENT_RECONCILE_DAYS = 7
+
 # Admin Site Branding
 ADMIN_SITE_TITLE = "MentorFlow Administration"
 ADMIN_SITE_HEADER = "MentorFlow"
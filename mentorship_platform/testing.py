@@ -0,0 +1,36 @@
+"""Factories shared by the apps' test suites."""
+from datetime import timedelta
+from functools import cache
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+@cache
+def _password_hash():
+    # Hashing is deliberately slow; suites create hundreds of users
+    return make_password('pw')
+
+
+def make_profile(username, role, organization=None):
+    """Create a user (password "pw") and fill in the profile the post_save signal made for it."""
+    user = User.objects.create(username=username, email=f'{username}@example.com', password=_password_hash())
+    user.profile.role = role
+    user.profile.organization = organization
+    user.profile.save()
+    return user.profile
+
+
+def backdate(obj, field, days):
+    """
+    Move an auto_now_add date ``days`` back from today.
+
+    Such rows can only be created "today", so loops that build history
+    for one mentee must create and backdate the oldest day first, or
+    today's row collides with the unique (mentee, date) constraint.
+    """
+    value = timezone.now().date() - timedelta(days=days)
+    type(obj).objects.filter(pk=obj.pk).update(**{field: value})
+    setattr(obj, field, value)
+    return obj
@@ -1,45 +1,61 @@
 from django.contrib import admin
+from django.db.models import Count
+from mentorship_platform.admin_pagination import DateDrilldownFilter, LargeTableAdmin
 from .models import Notification, Conversation, Message
 
 
 class MessageInline(admin.TabularInline):
     model = Message
     extra = 0
-    fields = ['sender', 'content', 'is_read', 'created_at']
+    fields = ['sender', 'content', 'created_at']
     readonly_fields = ['created_at']
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['recipient', 'trigger_event', 'notification_type', 'subject', 'sent_successfully', 'sent_at']
-    list_filter = ['notification_type', 'trigger_event', 'sent_successfully']
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ['recipient', 'trigger_event', 'notification_type', 'subject', 'delivery_status', 'attempts', 'sent_at']
+    list_filter = ['delivery_status', 'notification_type', 'trigger_event', 'sent_successfully',
+                   ('sent_at', DateDrilldownFilter)]
+    list_select_related = ['recipient']
     search_fields = ['recipient__username', 'subject', 'message']
-    date_hierarchy = 'sent_at'
-    readonly_fields = ['recipient', 'notification_type', 'trigger_event', 'subject', 'message', 'sent_at']
+    ordering = ['-sent_at', '-id']
+    readonly_fields = ['recipient', 'notification_type', 'trigger_event', 'subject', 'message', 'sent_at', 'attempts']
 
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ['participant1', 'participant2', 'created_at', 'updated_at', 'get_message_count']
     list_filter = ['created_at', 'updated_at']
+    list_select_related = ['participant1', 'participant2']
     search_fields = ['participant1__username', 'participant2__username']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at', 'updated_at']
     inlines = [MessageInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(message_count=Count('messages'))
+
     def get_message_count(self, obj):
-        return obj.messages.count()
+        return obj.message_count
     get_message_count.short_description = 'Messages'
+    get_message_count.admin_order_field = 'message_count'
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
-    list_display = ['conversation', 'sender', 'content_preview', 'is_read', 'created_at']
-    list_filter = ['is_read', 'created_at']
+class MessageAdmin(LargeTableAdmin):
+    list_display = ['conversation', 'sender', 'content_preview', 'read_by_recipient', 'created_at']
+    list_filter = [('created_at', DateDrilldownFilter)]
+    list_select_related = ['conversation__participant1', 'conversation__participant2', 'sender']
     search_fields = ['sender__username', 'content']
-    date_hierarchy = 'created_at'
+    ordering = ['-created_at', '-id']
     readonly_fields = ['conversation', 'sender', 'content', 'created_at']
 
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content'
+
+    def read_by_recipient(self, obj):
+        recipient = obj.conversation.get_other_participant(obj.sender)
+        return obj.conversation.has_read(recipient, obj)
+    read_by_recipient.boolean = True
+    read_by_recipient.short_description = 'Read'
@@ -1,46 +1,92 @@
+import logging
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from accounts.models import UserProfile
+from reports.models import DailyReport
+from todo.models import TodoList
+from .models import Notification
 from .services import NotificationService
 
+logger = logging.getLogger(__name__)
+
+
+def _reminder_recipients(already_submitted):
+    """
+    Split reminder-eligible mentees into those who still need a reminder and
+    those who already submitted today, without any per-user queries.
+
+    Args:
+        already_submitted: Queryset of today's submissions, filtered against
+            OuterRef('user') to mark compliant mentees
+
+    Returns:
+        (profiles to remind with users loaded, number of suppressed reminders)
+    """
+    profiles = UserProfile.objects.filter(
+        role='mentee',
+        email_notifications_enabled=True
+    ).exclude(user__email='').annotate(
+        already_submitted=Exists(already_submitted)
+    )
+
+    suppressed = profiles.filter(already_submitted=True).count()
+    return profiles.filter(already_submitted=False).select_related('user'), suppressed
+
 
 def send_morning_reminders():
     """
     Send morning reminders to all mentees to create their daily todo lists.
     This should be scheduled to run at 8 AM every day.
+    Mentees who already created today's todo list are skipped.
     """
-    mentee_profiles = UserProfile.objects.filter(role='mentee', email_notifications_enabled=True)
+    profiles, suppressed = _reminder_recipients(TodoList.objects.filter(
+        mentee=OuterRef('user'),
+        submission_date=timezone.now().date()
+    ))
 
-    for profile in mentee_profiles:
-        if profile.user.email:
-            NotificationService.send_notification(
-                recipient=profile.user,
-                trigger_event='morning_reminder',
-                subject='Good Morning! Time to Plan Your Day',
-                message=f'''Hi {profile.user.first_name or profile.user.username},
+    notifications = [
+        Notification(
+            recipient=profile.user,
+            notification_type='email',
+            trigger_event='morning_reminder',
+            subject='Good Morning! Time to Plan Your Day',
+            message=f'''Hi {profile.user.first_name or profile.user.username},
 
 It's time to create your todo list for today!
 
 Please log in to the mentorship platform and create your daily todo list to track your tasks and goals.
 
 Best regards,
-Mentorship Platform Team''',
-                notification_type='email'
-            )
+Mentorship Platform Team'''
+        )
+        for profile in profiles
+    ]
+
+    NotificationService.send_bulk_email(notifications)
+    logger.info('%s reminders: %d sent, %d suppressed (already submitted)',
+                'Morning', len(notifications), suppressed)
+    return {'sent': len(notifications), 'suppressed': suppressed}
 
 
 def send_evening_reminders():
     """
     Send evening reminders to all mentees to submit their daily reports.
     This should be scheduled to run at 6 PM every day.
+    Mentees who already submitted today's report are skipped.
     """
-    mentee_profiles = UserProfile.objects.filter(role='mentee', email_notifications_enabled=True)
+    profiles, suppressed = _reminder_recipients(DailyReport.objects.filter(
+        mentee=OuterRef('user'),
+        report_date=timezone.now().date()
+    ))
 
-    for profile in mentee_profiles:
-        if profile.user.email:
-            NotificationService.send_notification(
-                recipient=profile.user,
-                trigger_event='evening_reminder',
-                subject='How Did Your Day Go?',
-                message=f'''Hi {profile.user.first_name or profile.user.username},
+    notifications = [
+        Notification(
+            recipient=profile.user,
+            notification_type='email',
+            trigger_event='evening_reminder',
+            subject='How Did Your Day Go?',
+            message=f'''Hi {profile.user.first_name or profile.user.username},
 
 It's time to submit your daily report!
 
@@ -51,6 +97,25 @@ Please log in to the mentorship platform and share:
 - Your goals for tomorrow
 
 Best regards,
-Mentorship Platform Team''',
-                notification_type='email'
-            )
+Mentorship Platform Team'''
+        )
+        for profile in profiles
+    ]
+
+    NotificationService.send_bulk_email(notifications)
+    logger.info('%s reminders: %d sent, %d suppressed (already submitted)',
+                'Evening', len(notifications), suppressed)
+    return {'sent': len(notifications), 'suppressed': suppressed}
+
+
+def process_outbox():
+    """
+    Drain the notification outbox.
+    This should be scheduled to run every minute (or run `manage.py process_outbox --loop`).
+    """
+    total = 0
+    while True:
+        processed = NotificationService.process_outbox()
+        if not processed:
+            return total
+        total += processed
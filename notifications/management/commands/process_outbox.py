@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services import NotificationService
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued notifications from the outbox, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Notifications claimed per batch (default: NOTIFICATION_EMAIL_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new notifications instead of exiting once drained')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between polls when the outbox is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = NotificationService.process_outbox(batch_size=options['batch_size'])
+                total += processed
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} notification(s).'))
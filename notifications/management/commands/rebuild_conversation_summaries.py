@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from notifications.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = ('Recompute the denormalized last message of every conversation and derive '
+            'the unread counters from the read watermarks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Conversations updated per transaction')
+
+    def handle(self, *args, **options):
+        total = rebuild_summaries(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt summaries for {total} conversation(s).'))
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:16
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def settle_existing_notifications(apps, schema_editor):
+    """Existing rows were already sent inline; keep the worker from resending them."""
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.filter(sent_successfully=True).update(delivery_status='sent', attempts=1, next_attempt_at=None)
+    Notification.objects.filter(sent_successfully=False).update(delivery_status='dead', attempts=1, next_attempt_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alter_message_options_remove_message_recipient_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('dead', 'Dead Letter')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, help_text='When the outbox worker may (re)try this notification', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['delivery_status', 'next_attempt_at'], name='notif_outbox_idx'),
+        ),
+        migrations.RunPython(settle_existing_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:21
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def seed_watermarks(apps, schema_editor):
+    """Start each watermark at the newest message the legacy is_read flag marks as read."""
+    Conversation = apps.get_model('notifications', 'Conversation')
+    Message = apps.get_model('notifications', 'Message')
+
+    def newest_read_by(participant):
+        return Subquery(
+            Message.objects.filter(conversation=OuterRef('pk'), is_read=True)
+            .exclude(sender=OuterRef(participant))
+            .order_by('-id').values('id')[:1]
+        )
+
+    Conversation.objects.update(
+        participant1_read_watermark=Coalesce(newest_read_by('participant1'), 0),
+        participant2_read_watermark=Coalesce(newest_read_by('participant2'), 0),
+    )
+
+
+def flag_read_messages(apps, schema_editor):
+    """Write the watermarks back into is_read before the columns are dropped."""
+    Message = apps.get_model('notifications', 'Message')
+
+    for participant in ('participant1', 'participant2'):
+        Message.objects.filter(
+            id__lte=F(f'conversation__{participant}_read_watermark'), is_read=False
+        ).exclude(sender=F(f'conversation__{participant}')).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_message_conversation_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participant1_read_watermark',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant2_read_watermark',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(seed_watermarks, flag_read_messages),
+    ]
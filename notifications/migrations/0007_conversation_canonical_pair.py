@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+PER_PARTICIPANT_FIELDS = ['unread_count', 'read_watermark']
+PREVIEW_LENGTH = 100
+
+
+def canonicalize_conversations(apps, schema_editor):
+    """
+    Store every conversation as (lower user id, higher user id).
+
+    Reversed rows are flipped in place, or merged into the canonical thread
+    when both orders exist: messages move over, read watermarks combine and
+    the summary columns are recomputed.
+    """
+    Conversation = apps.get_model('notifications', 'Conversation')
+    Message = apps.get_model('notifications', 'Message')
+
+    # Materialized up front: the loop deletes and rewrites these rows
+    for reversed_conv in list(Conversation.objects.filter(participant1__gt=F('participant2'))):
+        canonical = Conversation.objects.filter(
+            participant1_id=reversed_conv.participant2_id,
+            participant2_id=reversed_conv.participant1_id
+        ).first()
+
+        if canonical is None:
+            swapped = {
+                'participant1_id': reversed_conv.participant2_id,
+                'participant2_id': reversed_conv.participant1_id,
+            }
+            for field in PER_PARTICIPANT_FIELDS:
+                swapped[f'participant1_{field}'] = getattr(reversed_conv, f'participant2_{field}')
+                swapped[f'participant2_{field}'] = getattr(reversed_conv, f'participant1_{field}')
+            # update() rather than save() so updated_at keeps its value
+            Conversation.objects.filter(pk=reversed_conv.pk).update(**swapped)
+            continue
+
+        Message.objects.filter(conversation=reversed_conv).update(conversation=canonical)
+        reversed_conv.delete()
+
+        # The reversed row's participant2 is the canonical row's participant1
+        p1_watermark = max(canonical.participant1_read_watermark, reversed_conv.participant2_read_watermark)
+        p2_watermark = max(canonical.participant2_read_watermark, reversed_conv.participant1_read_watermark)
+
+        messages = Message.objects.filter(conversation=canonical)
+        last_message = messages.order_by('-created_at', '-id').first()
+
+        Conversation.objects.filter(pk=canonical.pk).update(
+            created_at=min(canonical.created_at, reversed_conv.created_at),
+            updated_at=max(canonical.updated_at, reversed_conv.updated_at),
+            last_message=last_message,
+            last_message_preview=last_message.content[:PREVIEW_LENGTH] if last_message else '',
+            participant1_read_watermark=p1_watermark,
+            participant2_read_watermark=p2_watermark,
+            participant1_unread_count=messages.filter(id__gt=p1_watermark).exclude(
+                sender_id=canonical.participant1_id).count(),
+            participant2_unread_count=messages.filter(id__gt=p2_watermark).exclude(
+                sender_id=canonical.participant2_id).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_conversation_read_watermarks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_conversations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.CheckConstraint(condition=models.Q(('participant1__lte', models.F('participant2'))), name='conversation_canonical_pair'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:20
+
+from django.db import migrations, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+CHUNK_SIZE = 500
+PREVIEW_LENGTH = 100
+
+
+def seed_summaries(apps, schema_editor):
+    """
+    Fill the summary columns of threads created before they were maintained on save.
+
+    Unread counts are derived from the read watermarks: messages from the
+    other participant above the watermark.
+    """
+    Conversation = apps.get_model('notifications', 'Conversation')
+    Message = apps.get_model('notifications', 'Message')
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    summaries = Conversation.objects.filter(
+        last_message__isnull=True, pk__in=Message.objects.values('conversation')
+    ).order_by('pk').annotate(
+        latest_id=Subquery(latest.values('id')[:1]),
+        latest_content=Subquery(latest.values('content')[:1]),
+        p1_unread=Count('messages', filter=Q(messages__id__gt=F('participant1_read_watermark'))
+                        & ~Q(messages__sender=F('participant1'))),
+        p2_unread=Count('messages', filter=Q(messages__id__gt=F('participant2_read_watermark'))
+                        & ~Q(messages__sender=F('participant2'))),
+    )
+
+    last_pk = 0
+    while chunk := list(summaries.filter(pk__gt=last_pk)[:CHUNK_SIZE]):
+        for conversation in chunk:
+            conversation.last_message_id = conversation.latest_id
+            conversation.last_message_preview = (conversation.latest_content or '')[:PREVIEW_LENGTH]
+            conversation.participant1_unread_count = conversation.p1_unread
+            conversation.participant2_unread_count = conversation.p2_unread
+
+        with transaction.atomic():
+            Conversation.objects.bulk_update(chunk, [
+                'last_message', 'last_message_preview',
+                'participant1_unread_count', 'participant2_unread_count',
+            ])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_admin_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_summaries, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .realtime import publish_message, publish_read
 
 class Notification(models.Model):
     NOTIFICATION_TYPE_CHOICES = [('email', 'Email'), ('sms', 'SMS'), ('in_app', 'In App')]
@@ -11,6 +14,7 @@ class Notification(models.Model):
         ('message_received', 'Message Received'),
         ('mentor_assigned', 'Mentor Assigned'),
     ]
+    DELIVERY_STATUS_CHOICES = [('pending', 'Pending'), ('sent', 'Sent'), ('dead', 'Dead Letter')]
 
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     notification_type = models.CharField(max_length=10, choices=NOTIFICATION_TYPE_CHOICES, default='email')
@@ -22,27 +26,88 @@ class Notification(models.Model):
     sent_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
 
+    # Outbox delivery state
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, default=timezone.now,
+                                           help_text="When the outbox worker may (re)try this notification")
+
     class Meta:
         ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['delivery_status', 'next_attempt_at'], name='notif_outbox_idx'),
+            models.Index(fields=['sent_at', 'id'], name='notif_sent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject} - {self.recipient.username}"
 
 
+class ConversationManager(models.Manager):
+    def canonical_pair(self, user_a, user_b):
+        """Participants ordered (lower id, higher id) as they are stored."""
+        return (user_a, user_b) if user_a.pk < user_b.pk else (user_b, user_a)
+
+    def between(self, user_a, user_b):
+        """The conversation between two users, or None. A single unique-index probe."""
+        participant1, participant2 = self.canonical_pair(user_a, user_b)
+        return self.filter(participant1=participant1, participant2=participant2).first()
+
+    def get_or_create_between(self, user_a, user_b):
+        """
+        Get or create the conversation between two users.
+
+        The unique (participant1, participant2) index on the canonical pair
+        makes concurrent calls converge on a single thread.
+        """
+        participant1, participant2 = self.canonical_pair(user_a, user_b)
+        return self.get_or_create(participant1=participant1, participant2=participant2)
+
+
 class Conversation(models.Model):
-    """A conversation thread between two users."""
+    """
+    A conversation thread between two users.
+
+    Participants are stored as a canonical pair (participant1 has the lower
+    user id), so each pair of users has exactly one thread.
+    """
+    PREVIEW_LENGTH = 100
+
     participant1 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations_as_p1')
     participant2 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations_as_p2')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized summary, maintained by Message.save and mark_read
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='+')
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+    participant1_unread_count = models.PositiveIntegerField(default=0)
+    participant2_unread_count = models.PositiveIntegerField(default=0)
+
+    # Read watermarks: id of the newest message each participant has read
+    participant1_read_watermark = models.BigIntegerField(default=0)
+    participant2_read_watermark = models.BigIntegerField(default=0)
+
+    objects = ConversationManager()
+
     class Meta:
         ordering = ['-updated_at']
         unique_together = ['participant1', 'participant2']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(participant1__lte=models.F('participant2')),
+                                   name='conversation_canonical_pair'),
+        ]
 
     def __str__(self):
         return f"Conversation: {self.participant1.username} ↔ {self.participant2.username}"
 
+    def save(self, *args, **kwargs):
+        # New threads are always stored under the canonical (low id, high id) pair
+        if self._state.adding and self.participant1_id > self.participant2_id:
+            self.participant1, self.participant2 = self.participant2, self.participant1
+        super().save(*args, **kwargs)
+
     def get_other_participant(self, user):
         """Get the other participant in the conversation."""
         if user == self.participant1:
@@ -51,11 +116,70 @@ class Conversation(models.Model):
 
     def get_last_message(self):
         """Get the most recent message in this conversation."""
-        return self.messages.first()
+        return self.last_message
+
+    def unread_count_field(self, user):
+        """Name of the unread counter column belonging to ``user``."""
+        if user.pk == self.participant1_id:
+            return 'participant1_unread_count'
+        return 'participant2_unread_count'
+
+    def read_watermark_field(self, user):
+        """Name of the read watermark column belonging to ``user``."""
+        if user.pk == self.participant1_id:
+            return 'participant1_read_watermark'
+        return 'participant2_read_watermark'
 
     def get_unread_count(self, user):
         """Get count of unread messages for a user."""
-        return self.messages.filter(is_read=False, sender__ne=user).count()
+        return getattr(self, self.unread_count_field(user))
+
+    def has_read(self, user, message):
+        """Whether ``user`` has read ``message`` (own messages count as read)."""
+        return message.sender_id == user.pk or message.pk <= getattr(self, self.read_watermark_field(user))
+
+    def mark_read(self, user, up_to=None):
+        """
+        Move ``user``'s read watermark up to the last message they were shown.
+
+        Skipped without a query when the watermark is already current. The
+        legacy ``Message.is_read`` flag is set for the newly covered messages
+        and the unread counter keeps counting anything newer than ``up_to``.
+
+        Args:
+            user: The participant who read the conversation
+            up_to: Id of the newest message displayed to them, defaults to the
+                last message (capped at it either way)
+
+        Returns:
+            True if the watermark moved.
+        """
+        watermark = self.read_watermark_field(user)
+        counter = self.unread_count_field(user)
+        if self.last_message_id is None:
+            return False
+        target = self.last_message_id if up_to is None else min(up_to, self.last_message_id)
+        if getattr(self, watermark) >= target:
+            return False
+
+        with transaction.atomic():
+            # Lock the row so the counter can't race a message being saved
+            current = Conversation.objects.select_for_update().values(watermark, 'last_message_id').get(pk=self.pk)
+            previous = current[watermark]
+            target = min(target, current['last_message_id'])
+            if previous >= target:
+                setattr(self, watermark, previous)
+                return False
+
+            from_other = Message.objects.filter(conversation=self).exclude(sender=user)
+            from_other.filter(id__gt=previous, id__lte=target).update(is_read=True)
+            unread = from_other.filter(id__gt=target).count() if target < current['last_message_id'] else 0
+            Conversation.objects.filter(pk=self.pk).update(**{watermark: target, counter: unread})
+
+        setattr(self, watermark, target)
+        setattr(self, counter, unread)
+        publish_read(self, user)
+        return True
 
 
 class Message(models.Model):
@@ -64,17 +188,36 @@ class Message(models.Model):
                                      null=True, blank=True)  # Temporarily nullable for migration
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_thread_messages')
     content = models.TextField()
+    # Legacy per-message flag, kept in step by Conversation.mark_read; read
+    # state is answered from the conversation's read watermarks (see has_read)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at'], name='message_conv_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='message_created_idx'),
+        ]
 
     def __str__(self):
         preview = self.content[:50] + '...' if len(self.content) > 50 else self.content
         return f"{self.sender.username}: {preview}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update conversation's updated_at timestamp
-        self.conversation.save()
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding and self.conversation_id:
+                # Single targeted UPDATE instead of re-saving the whole conversation
+                recipient_counter = (
+                    'participant2_unread_count' if self.sender_id == self.conversation.participant1_id
+                    else 'participant1_unread_count'
+                )
+                Conversation.objects.filter(pk=self.conversation_id).update(
+                    last_message=self,
+                    last_message_preview=self.content[:Conversation.PREVIEW_LENGTH],
+                    updated_at=timezone.now(),
+                    **{recipient_counter: F(recipient_counter) + 1}
+                )
+                publish_message(self)
@@ -0,0 +1,126 @@
+"""
+Real-time delivery of message events.
+
+Message writes publish small events to a broker; the ``message_stream_view``
+server-sent-events endpoint subscribes the logged-in user and forwards them,
+so open pages update incrementally instead of reloading the inbox.
+
+The default broker is in-process, which is enough for a single ASGI worker.
+Any object with the same ``subscribe``/``unsubscribe``/``publish`` methods
+(e.g. one backed by a local Redis-compatible server) can be plugged in via
+the NOTIFICATIONS_REALTIME_BROKER setting.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One connected client: an asyncio queue bound to the client's event loop."""
+
+    def __init__(self, user_id, max_pending=100):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        """Thread-safe: may be called from any thread."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client must not grow memory without bound; it
+            # replays missed messages via Last-Event-ID when it reconnects
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Fan-out of events to the subscriptions of each user in this process."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Must be called from the subscriber's running event loop."""
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's event loop has already closed
+                self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'NOTIFICATIONS_REALTIME_BROKER',
+                               'notifications.realtime.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def message_event(message):
+    """Serialize a Message into the event pushed to both participants."""
+    return {
+        'type': 'message',
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def publish_message(message):
+    """Push a new message to both participants once the transaction commits."""
+    conversation = message.conversation
+    event = message_event(message)
+
+    def send():
+        broker = get_broker()
+        for user_id in {conversation.participant1_id, conversation.participant2_id}:
+            broker.publish(user_id, event)
+
+    transaction.on_commit(send)
+
+
+def publish_read(conversation, user):
+    """Tell ``user``'s other open pages that a conversation has been read."""
+    event = {
+        'type': 'read',
+        'conversation_id': conversation.id,
+        'unread_count': conversation.get_unread_count(user)
+    }
+    transaction.on_commit(lambda: get_broker().publish(user.pk, event))
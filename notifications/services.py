@@ -1,5 +1,10 @@
-from django.core.mail import send_mail
+from datetime import timedelta
+
+from django.core.mail import get_connection, EmailMessage
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from .models import Notification
 
 try:
@@ -9,12 +14,19 @@ except ImportError:
     TWILIO_AVAILABLE = False
 
 
+class PermanentDeliveryError(Exception):
+    """A delivery failure that retrying will not fix (e.g. SMS disabled)."""
+
+
 class NotificationService:
     @staticmethod
     def send_notification(recipient, trigger_event, subject, message, notification_type='email'):
         """
         Send a notification to a user via email, SMS, or in-app.
 
+        With NOTIFICATION_OUTBOX_ENABLED the notification is only queued and
+        the outbox worker delivers it, so callers never wait on SMTP/Twilio.
+
         Args:
             recipient: User object
             trigger_event: The event that triggered this notification
@@ -30,37 +42,252 @@ class NotificationService:
             message=message
         )
 
-        try:
-            if notification_type == 'email':
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[recipient.email],
-                    fail_silently=False
-                )
-            elif notification_type == 'sms':
-                if not TWILIO_AVAILABLE:
-                    notification.error_message = "Twilio is not installed"
-                    notification.save()
-                    return notification
-
-                if recipient.profile.phone_number and recipient.profile.sms_notifications_enabled:
-                    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-                    client.messages.create(
-                        body=message,
-                        from_=settings.TWILIO_PHONE_NUMBER,
-                        to=recipient.profile.phone_number
-                    )
-                else:
-                    notification.error_message = "SMS not enabled or no phone number provided"
-                    notification.save()
-                    return notification
+        if not NotificationService.outbox_enabled():
+            notification.attempts = 1
+            NotificationService.deliver([notification])
+
+        return notification
+
+    @staticmethod
+    def send_bulk_email(notifications, chunk_size=None):
+        """
+        Save and send a batch of email notifications over a single connection.
+
+        The rows are written with one bulk INSERT. Inline, the messages are
+        then sent in chunks over one reused mail connection and each chunk's
+        results are written back with one bulk UPDATE; in outbox mode the worker
+        picks them up instead.
+
+        Args:
+            notifications: Unsaved Notification objects (recipient must be loaded)
+            chunk_size: Messages per batch, defaults to NOTIFICATION_EMAIL_BATCH_SIZE
+        """
+        if not notifications:
+            return []
+
+        chunk_size = chunk_size or getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 100)
+        inline = not NotificationService.outbox_enabled()
+        for notification in notifications:
+            notification.attempts = 1 if inline else 0
+        notifications = Notification.objects.bulk_create(notifications, batch_size=chunk_size)
+
+        if inline:
+            NotificationService.deliver(notifications, chunk_size=chunk_size)
+        return notifications
+
+    @staticmethod
+    def outbox_enabled():
+        return getattr(settings, 'NOTIFICATION_OUTBOX_ENABLED', False)
+
+    @staticmethod
+    def process_outbox(batch_size=None):
+        """
+        Claim and deliver one batch of due notifications.
+
+        The batch is sent in chunks of NOTIFICATION_DELIVERY_CHUNK_SIZE;
+        each chunk's results are saved as soon as it is sent and the lease
+        on the rest of the batch is renewed, so neither a slow relay nor a
+        worker crash gets accepted mail sent again.
+
+        Returns:
+            The number of notifications claimed (0 when the outbox is drained).
+        """
+        batch_size = batch_size or getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 100)
+        notifications = NotificationService._claim_due(batch_size)
+        if notifications:
+            NotificationService.deliver(
+                notifications,
+                chunk_size=getattr(settings, 'NOTIFICATION_DELIVERY_CHUNK_SIZE', 20),
+                leased=True
+            )
+        return len(notifications)
+
+    @staticmethod
+    def _claim_due(batch_size):
+        """
+        Lease a batch of due rows to this worker.
+
+        The lease moves ``next_attempt_at`` into the future, so a worker that
+        dies mid-batch only delays those rows until the lease expires. The
+        lease timestamp doubles as a claim token: on databases without
+        SKIP LOCKED, rows another worker claimed first simply don't match it.
+        """
+        now = timezone.now()
+        lease_until = now + timedelta(seconds=getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 300))
+
+        with transaction.atomic():
+            due = Notification.objects.filter(
+                delivery_status='pending',
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at')
+            if transaction.get_connection().features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            ids = list(due.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return []
+
+            Notification.objects.filter(
+                id__in=ids,
+                delivery_status='pending',
+                next_attempt_at__lte=now
+            ).update(next_attempt_at=lease_until, attempts=F('attempts') + 1)
+
+        return list(
+            Notification.objects.filter(id__in=ids, next_attempt_at=lease_until)
+            .select_related('recipient__profile')
+            .order_by('id')
+        )
+
+    @staticmethod
+    def deliver(notifications, chunk_size=None, leased=False):
+        """
+        Deliver already-saved notifications and record the outcome.
+
+        Emails share one connection and are sent in chunks, and each chunk's
+        results are saved before the next one is sent; failures are
+        rescheduled with exponential backoff until NOTIFICATION_MAX_ATTEMPTS,
+        after which the row is dead-lettered.
+
+        Args:
+            notifications: Saved Notification objects
+            chunk_size: Emails per chunk, defaults to NOTIFICATION_EMAIL_BATCH_SIZE
+            leased: The rows were claimed by process_outbox; the lease on the
+                unsent ones is renewed before every chunk
+        """
+        chunk_size = chunk_size or getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 100)
+        remaining = [n for n in notifications if n.notification_type == 'email']
+
+        if remaining:
+            try:
+                with get_connection(fail_silently=False) as connection:
+                    while remaining:
+                        if leased:
+                            remaining = NotificationService._renew_lease(remaining)
+                        chunk, remaining = remaining[:chunk_size], remaining[chunk_size:]
+                        errors = NotificationService._send_email_chunk(connection, chunk)
+                        for notification, error in zip(chunk, errors):
+                            NotificationService._record_result(notification, error)
+                        NotificationService._save_results(chunk)
+            except Exception as e:
+                # Could not open the connection at all
+                for notification in remaining:
+                    NotificationService._record_result(notification, e)
+                NotificationService._save_results(remaining)
+
+        others = [n for n in notifications if n.notification_type != 'email']
+        for notification in others:
+            if notification.notification_type == 'sms':
+                try:
+                    NotificationService._send_sms(notification)
+                    NotificationService._record_result(notification, None)
+                except Exception as e:
+                    NotificationService._record_result(notification, e)
+            else:
+                NotificationService._record_result(notification, None)
+        NotificationService._save_results(others)
+
+    @staticmethod
+    def _save_results(notifications):
+        Notification.objects.bulk_update(
+            notifications,
+            ['delivery_status', 'sent_successfully', 'error_message', 'next_attempt_at', 'attempts']
+        )
+
+    @staticmethod
+    def _renew_lease(notifications):
+        """
+        Push the lease on claimed, still unsent rows forward.
+
+        The rows share the lease timestamp they were claimed (or last
+        renewed) with, which is also the claim token: rows whose lease
+        already ran out and that another worker claimed no longer match it
+        and are dropped, so they are never sent by both workers.
 
+        Returns:
+            The notifications this worker still holds.
+        """
+        lease_until = timezone.now() + timedelta(seconds=getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 300))
+        ids = [n.pk for n in notifications]
+        renewed = Notification.objects.filter(
+            id__in=ids,
+            delivery_status='pending',
+            next_attempt_at=notifications[0].next_attempt_at
+        ).update(next_attempt_at=lease_until)
+
+        if renewed < len(ids):
+            held = set(
+                Notification.objects.filter(id__in=ids, next_attempt_at=lease_until)
+                .values_list('id', flat=True)
+            )
+            notifications = [n for n in notifications if n.pk in held]
+        for notification in notifications:
+            notification.next_attempt_at = lease_until
+        return notifications
+
+    @staticmethod
+    def _record_result(notification, error):
+        """Apply a delivery outcome: sent, retry later, or dead-letter."""
+        if error is None:
+            notification.delivery_status = 'sent'
             notification.sent_successfully = True
-            notification.save()
-        except Exception as e:
-            notification.error_message = str(e)
-            notification.save()
+            notification.error_message = None
+            notification.next_attempt_at = None
+            return
 
-        return notification
+        notification.error_message = str(error)
+        max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+        if isinstance(error, PermanentDeliveryError) or notification.attempts >= max_attempts:
+            notification.delivery_status = 'dead'
+            notification.next_attempt_at = None
+        else:
+            delay = getattr(settings, 'NOTIFICATION_RETRY_BASE_DELAY', 60) * 2 ** (notification.attempts - 1)
+            notification.delivery_status = 'pending'
+            notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+    @staticmethod
+    def _send_sms(notification):
+        if not TWILIO_AVAILABLE:
+            raise PermanentDeliveryError("Twilio is not installed")
+
+        profile = notification.recipient.profile
+        if not (profile.phone_number and profile.sms_notifications_enabled):
+            raise PermanentDeliveryError("SMS not enabled or no phone number provided")
+
+        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        client.messages.create(
+            body=notification.message,
+            from_=settings.TWILIO_PHONE_NUMBER,
+            to=profile.phone_number
+        )
+
+    @staticmethod
+    def _send_email_chunk(connection, notifications):
+        """
+        Send one chunk over the shared connection, one message per call.
+
+        A batch send that fails partway cannot tell which messages the
+        server already accepted, so each message is sent and accounted for
+        separately; after a failure the connection is reopened and the next
+        message is tried, and nothing accepted is ever sent twice.
+
+        Returns:
+            A list with None (sent) or the exception for each notification.
+        """
+        errors = []
+        for notification in notifications:
+            email = EmailMessage(
+                subject=notification.subject,
+                body=notification.message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[notification.recipient.email],
+                connection=connection
+            )
+            try:
+                if not connection.send_messages([email]):
+                    raise PermanentDeliveryError('The mail server accepted no recipients')
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+                # The connection may be left in a bad state, start a fresh one
+                connection.close()
+        return errors
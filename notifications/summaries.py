@@ -0,0 +1,55 @@
+"""Recomputation of the denormalized Conversation summary columns."""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from .models import Conversation, Message
+
+
+def rebuild_summaries(conversations=None, chunk_size=500):
+    """
+    Recompute the last message, preview and unread counters of conversations.
+
+    Unread counts are derived from the read watermarks: messages from the
+    other participant above the watermark.
+
+    Args:
+        conversations: Queryset to rebuild (default: all)
+        chunk_size: Conversations updated per transaction
+
+    Returns:
+        The number of conversations rebuilt
+    """
+    if conversations is None:
+        conversations = Conversation.objects.all()
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    summaries = conversations.order_by('pk').annotate(
+        latest_id=Subquery(latest.values('id')[:1]),
+        latest_content=Subquery(latest.values('content')[:1]),
+        p1_unread=Count('messages', filter=Q(messages__id__gt=F('participant1_read_watermark'))
+                        & ~Q(messages__sender=F('participant1'))),
+        p2_unread=Count('messages', filter=Q(messages__id__gt=F('participant2_read_watermark'))
+                        & ~Q(messages__sender=F('participant2'))),
+    )
+
+    total = 0
+    last_pk = 0
+    while True:
+        chunk = list(summaries.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return total
+
+        for conversation in chunk:
+            conversation.last_message_id = conversation.latest_id
+            conversation.last_message_preview = (conversation.latest_content or '')[:Conversation.PREVIEW_LENGTH]
+            conversation.participant1_unread_count = conversation.p1_unread
+            conversation.participant2_unread_count = conversation.p2_unread
+
+        with transaction.atomic():
+            Conversation.objects.bulk_update(chunk, [
+                'last_message', 'last_message_preview',
+                'participant1_unread_count', 'participant2_unread_count',
+            ])
+
+        total += len(chunk)
+        last_pk = chunk[-1].pk
+
@@ -1,3 +1,581 @@
-from django.test import TestCase
+import asyncio
+import threading
+from datetime import timedelta
+from io import StringIO
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Organization
+from mentorship_platform.pagination import ApproximateCountPaginator
+from mentorship_platform.testing import make_profile
+from reports.models import DailyReport
+from todo.services import clean_item, create_todo_list
+
+from .cron import send_evening_reminders, send_morning_reminders
+from .models import Conversation, Message, Notification
+from .realtime import InProcessBroker, get_broker, message_event
+from .services import NotificationService
+from . import views
+
+
+class FailingEmailBackend(EmailBackend):
+    """locmem backend that refuses every message."""
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP relay unavailable')
+
+
+class FlakyEmailBackend(EmailBackend):
+    """locmem backend whose connection drops on the ``fail_on``-th message (1-based)."""
+    fail_on = 3
+    attempts = 0
+
+    def send_messages(self, messages):
+        for message in messages:
+            FlakyEmailBackend.attempts += 1
+            if FlakyEmailBackend.attempts == self.fail_on:
+                raise ConnectionResetError('Connection dropped')
+            super().send_messages([message])
+        return len(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_OUTBOX_ENABLED=True,
+    NOTIFICATION_MAX_ATTEMPTS=3,
+    NOTIFICATION_RETRY_BASE_DELAY=60,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('mentor', 'mentor@example.com', 'pw')
+
+    def enqueue(self):
+        return NotificationService.send_notification(
+            recipient=self.user,
+            trigger_event='todo_submitted',
+            subject='Todo List Submitted',
+            message='Please review it.',
+        )
+
+    def make_due(self, notification):
+        Notification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+
+    def test_send_notification_only_enqueues(self):
+        notification = self.enqueue()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(notification.delivery_status, 'pending')
+        self.assertEqual(notification.attempts, 0)
+
+    def test_worker_delivers_pending_notifications(self):
+        notification = self.enqueue()
+
+        self.assertEqual(NotificationService.process_outbox(), 1)
+        self.assertEqual(NotificationService.process_outbox(), 0)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['mentor@example.com'])
+        notification.refresh_from_db()
+        self.assertEqual(notification.delivery_status, 'sent')
+        self.assertTrue(notification.sent_successfully)
+        self.assertEqual(notification.attempts, 1)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingEmailBackend')
+    def test_failures_back_off_then_dead_letter(self):
+        notification = self.enqueue()
+
+        NotificationService.process_outbox()
+        notification.refresh_from_db()
+        self.assertEqual(notification.delivery_status, 'pending')
+        self.assertIn('SMTP relay unavailable', notification.error_message)
+        first_delay = notification.next_attempt_at - timezone.now()
+        self.assertGreater(first_delay, timedelta(seconds=50))
+
+        # Not due yet: the worker leaves it alone
+        self.assertEqual(NotificationService.process_outbox(), 0)
+
+        self.make_due(notification)
+        NotificationService.process_outbox()
+        notification.refresh_from_db()
+        self.assertGreater(notification.next_attempt_at - timezone.now(), timedelta(seconds=110))
+
+        self.make_due(notification)
+        NotificationService.process_outbox()
+        notification.refresh_from_db()
+        self.assertEqual(notification.delivery_status, 'dead')
+        self.assertEqual(notification.attempts, 3)
+        self.assertIsNone(notification.next_attempt_at)
+        self.assertEqual(NotificationService.process_outbox(), 0)
+
+    @override_settings(NOTIFICATION_DELIVERY_CHUNK_SIZE=2)
+    def test_crash_midway_keeps_results_of_sent_chunks(self):
+        notifications = [self.enqueue() for _ in range(5)]
+        send_chunk = NotificationService._send_email_chunk
+        calls = []
+
+        def crash_on_second_chunk(connection, chunk):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise KeyboardInterrupt('worker killed')
+            return send_chunk(connection, chunk)
+
+        with mock.patch.object(NotificationService, '_send_email_chunk', side_effect=crash_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                NotificationService.process_outbox()
+
+        statuses = [Notification.objects.get(pk=n.pk).delivery_status for n in notifications]
+        self.assertEqual(statuses, ['sent', 'sent', 'pending', 'pending', 'pending'])
+
+        # Once the lease expires another worker finishes the batch without resending
+        Notification.objects.filter(delivery_status='pending').update(next_attempt_at=timezone.now())
+        self.assertEqual(NotificationService.process_outbox(), 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(NOTIFICATION_DELIVERY_CHUNK_SIZE=2)
+    def test_lease_is_renewed_per_chunk_and_lost_rows_are_skipped(self):
+        notifications = [self.enqueue() for _ in range(5)]
+        send_chunk = NotificationService._send_email_chunk
+        leases = []
+        taken_over = timezone.now() + timedelta(hours=1)
+
+        def slow_relay(connection, chunk):
+            leases.append(Notification.objects.get(pk=chunk[0].pk).next_attempt_at)
+            if len(leases) == 1:
+                # The lease ran out and another worker claimed the last row
+                Notification.objects.filter(pk=notifications[-1].pk).update(next_attempt_at=taken_over)
+            return send_chunk(connection, chunk)
+
+        with mock.patch.object(NotificationService, '_send_email_chunk', side_effect=slow_relay):
+            NotificationService.process_outbox()
+
+        self.assertEqual(len(leases), 2)
+        self.assertLess(leases[0], leases[1])
+        self.assertEqual(len(mail.outbox), 4)
+        other = Notification.objects.get(pk=notifications[-1].pk)
+        self.assertEqual(other.delivery_status, 'pending')
+        self.assertEqual(other.next_attempt_at, taken_over)
+
+    @override_settings(NOTIFICATION_OUTBOX_ENABLED=False)
+    def test_inline_mode_sends_immediately(self):
+        notification = self.enqueue()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(notification.delivery_status, 'sent')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_OUTBOX_ENABLED=False,
+)
+class ReminderTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.done, self.pending = (make_profile(name, 'mentee', organization) for name in ('done', 'pending'))
+        make_profile('mentor', 'mentor', organization)
+        quiet = make_profile('quiet', 'mentee', organization)
+        quiet.email_notifications_enabled = False
+        quiet.save()
+
+    def test_morning_reminder_skips_mentees_with_a_todo_list(self):
+        create_todo_list(self.done.user, [clean_item({'title': 'Read'})])
+
+        self.assertEqual(send_morning_reminders(), {'sent': 1, 'suppressed': 1})
+        self.assertEqual([message.to for message in mail.outbox], [['pending@example.com']])
+        self.assertEqual(Notification.objects.get().trigger_event, 'morning_reminder')
+
+    def test_evening_reminder_skips_mentees_with_a_report(self):
+        DailyReport.objects.create(mentee=self.done.user, mood=4, achievements='a', next_steps='b')
+
+        self.assertEqual(send_evening_reminders(), {'sent': 1, 'suppressed': 1})
+        self.assertEqual([message.to for message in mail.outbox], [['pending@example.com']])
+
+
+@override_settings(
+    EMAIL_BACKEND='notifications.tests.FlakyEmailBackend',
+    NOTIFICATION_OUTBOX_ENABLED=False,
+    NOTIFICATION_EMAIL_BATCH_SIZE=10,
+)
+class BulkEmailTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.attempts = 0
+        self.users = [User.objects.create_user(f'mentee{i}', f'mentee{i}@example.com', 'pw') for i in range(5)]
+
+    def test_failure_midway_does_not_resend_accepted_messages(self):
+        notifications = NotificationService.send_bulk_email([
+            Notification(recipient=user, notification_type='email', trigger_event='morning_reminder',
+                         subject='Plan your day', message='Hi')
+            for user in self.users
+        ])
+
+        sent_to = [message.to[0] for message in mail.outbox]
+        self.assertEqual(sent_to, ['mentee0@example.com', 'mentee1@example.com',
+                                   'mentee3@example.com', 'mentee4@example.com'])
+        statuses = [Notification.objects.get(pk=n.pk).delivery_status for n in notifications]
+        self.assertEqual(statuses, ['sent', 'sent', 'pending', 'sent', 'sent'])
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('mentor', 'mentor@example.com', 'pw')
+        self.client.force_login(self.user)
+        self.url = reverse('notifications:inbox')
+
+    def start_threads(self, count, start=0):
+        for i in range(start, start + count):
+            other = User.objects.create_user(f'mentee{i}', password='pw')
+            conversation, _ = Conversation.objects.get_or_create_between(self.user, other)
+            Message.objects.create(conversation=conversation, sender=other, content=f'Hello {i}')
+            Message.objects.create(conversation=conversation, sender=other, content=f'Still there {i}?')
+
+    def test_query_count_does_not_grow_with_threads(self):
+        self.start_threads(2)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        self.start_threads(20, start=2)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['conversations']), 22)
+
+    def test_unread_counts_previews_and_pages(self):
+        self.start_threads(3)
+        with mock.patch.object(views, 'INBOX_PAGE_SIZE', 2):
+            first = self.client.get(self.url).context
+            second = self.client.get(self.url, {'cursor': first['next_cursor']}).context
+
+        rows = first['conversations'] + second['conversations']
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual([row['other_user'].username for row in rows], ['mentee2', 'mentee1', 'mentee0'])
+        self.assertEqual([row['unread_count'] for row in rows], [2, 2, 2])
+        self.assertEqual(rows[0]['last_message'], 'Still there 2?')
+
+
+class ConversationSummaryTests(TestCase):
+    def setUp(self):
+        self.mentor = User.objects.create_user('mentor', password='pw')
+        self.mentee = User.objects.create_user('mentee', password='pw')
+        self.conversation, _ = Conversation.objects.get_or_create_between(self.mentor, self.mentee)
+
+    def send(self, sender, content):
+        return Message.objects.create(conversation=self.conversation, sender=sender, content=content)
+
+    def test_counters_follow_new_messages(self):
+        self.send(self.mentee, 'Hi')
+        last = self.send(self.mentee, 'x' * 150)
+        self.send(self.mentor, 'Hello')
+        self.conversation.refresh_from_db()
+
+        self.assertEqual(self.conversation.get_unread_count(self.mentor), 2)
+        self.assertEqual(self.conversation.get_unread_count(self.mentee), 1)
+        self.assertEqual(self.conversation.last_message.content, 'Hello')
+
+        self.send(self.mentee, last.content)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_preview, 'x' * Conversation.PREVIEW_LENGTH)
+
+    def test_rebuild_restores_drifted_summaries(self):
+        self.send(self.mentee, 'Hi')
+        newest = self.send(self.mentor, 'Hello')
+        Conversation.objects.update(
+            last_message=None, last_message_preview='', participant1_unread_count=7, participant2_unread_count=7
+        )
+
+        call_command('rebuild_conversation_summaries', stdout=StringIO())
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, newest)
+        self.assertEqual(self.conversation.last_message_preview, 'Hello')
+        self.assertEqual(self.conversation.get_unread_count(self.mentor), 1)
+        self.assertEqual(self.conversation.get_unread_count(self.mentee), 1)
+
+
+    def test_migration_seeds_threads_without_a_summary(self):
+        self.send(self.mentee, 'Hi')
+        newest = self.send(self.mentee, 'Still there?')
+        Conversation.objects.update(last_message=None, last_message_preview='', participant1_unread_count=0,
+                                    participant2_unread_count=0)
+
+        import_module('notifications.migrations.0009_seed_conversation_summaries').seed_summaries(apps, None)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, newest)
+        self.assertEqual(self.conversation.get_unread_count(self.mentor), 2)
+
+class ConversationHistoryTests(TestCase):
+    def setUp(self):
+        self.mentor = User.objects.create_user('mentor', password='pw')
+        self.mentee = User.objects.create_user('mentee', password='pw')
+        self.conversation, _ = Conversation.objects.get_or_create_between(self.mentor, self.mentee)
+        for i in range(7):
+            Message.objects.create(conversation=self.conversation, sender=self.mentee, content=f'Message {i}')
+        self.client.force_login(self.mentor)
+
+    def test_detail_shows_only_the_newest_page(self):
+        with mock.patch.object(views, 'MESSAGE_PAGE_SIZE', 3):
+            response = self.client.get(reverse('notifications:conversation_detail', args=[self.conversation.pk]))
+        self.assertEqual([m.content for m in response.context['messages']], ['Message 4', 'Message 5', 'Message 6'])
+        self.assertIsNotNone(response.context['older_cursor'])
+
+    def test_older_pages_cover_every_message_once(self):
+        url = reverse('notifications:conversation_messages', args=[self.conversation.pk])
+        seen, cursor = [], None
+        with mock.patch.object(views, 'MESSAGE_PAGE_SIZE', 3):
+            while True:
+                data = self.client.get(url, {'format': 'json', **({'before': cursor} if cursor else {})}).json()
+                seen = [message['content'] for message in data['messages']] + seen
+                cursor = data['next_cursor']
+                if cursor is None:
+                    break
+        self.assertEqual(seen, [f'Message {i}' for i in range(7)])
+
+        response = self.client.get(url)
+        self.assertContains(response, 'Message 6')
+
+    def test_non_participants_cannot_read_history(self):
+        self.client.force_login(User.objects.create_user('outsider', password='pw'))
+        url = reverse('notifications:conversation_messages', args=[self.conversation.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(reverse('notifications:conversation_detail', args=[self.conversation.pk]))
+        self.assertRedirects(response, reverse('notifications:inbox'))
+
+
+class ReadStateTests(TestCase):
+    def setUp(self):
+        self.mentor = User.objects.create_user('mentor', password='pw')
+        self.mentee = User.objects.create_user('mentee', password='pw')
+        self.conversation, _ = Conversation.objects.get_or_create_between(self.mentor, self.mentee)
+        self.sent = [
+            Message.objects.create(conversation=self.conversation, sender=self.mentee, content=f'Hi {i}')
+            for i in range(3)
+        ]
+        Message.objects.create(conversation=self.conversation, sender=self.mentor, content='Hello')
+        self.conversation.refresh_from_db()
+        self.client.force_login(self.mentor)
+        self.read_url = reverse('notifications:conversation_read', args=[self.conversation.pk])
+
+    def test_watermark_stops_at_the_last_displayed_message(self):
+        response = self.client.post(self.read_url, {'up_to': self.sent[1].pk})
+        self.assertEqual(response.json()['unread_count'], 1)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.participant1_read_watermark, self.sent[1].pk)
+        self.assertEqual(list(Message.objects.filter(is_read=True)), self.sent[:2])
+        self.assertFalse(self.conversation.has_read(self.mentor, self.sent[2]))
+
+        # An older id never moves the watermark back
+        self.assertEqual(self.client.post(self.read_url, {'up_to': self.sent[0].pk}).json()['unread_count'], 1)
+        self.assertEqual(self.client.post(self.read_url, {'up_to': 10 ** 9}).json()['unread_count'], 0)
+        self.assertEqual(Message.objects.filter(is_read=True).count(), 3)
+        self.assertEqual(self.client.post(self.read_url).status_code, 400)
+
+    def test_opening_the_conversation_reads_it(self):
+        self.client.get(reverse('notifications:conversation_detail', args=[self.conversation.pk]))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.participant1_read_watermark, self.conversation.last_message_id)
+        self.assertEqual(self.conversation.get_unread_count(self.mentor), 0)
+        self.assertEqual(self.conversation.get_unread_count(self.mentee), 1)
+
+    def test_migration_moves_read_state_both_ways(self):
+        migration = import_module('notifications.migrations.0006_conversation_read_watermarks')
+        Message.objects.filter(pk__in=[self.sent[0].pk, self.sent[1].pk]).update(is_read=True)
+        Conversation.objects.update(participant1_read_watermark=0, participant2_read_watermark=0)
+
+        migration.seed_watermarks(apps, None)
+        self.conversation.refresh_from_db()
+        self.assertEqual(
+            (self.conversation.participant1_read_watermark, self.conversation.participant2_read_watermark),
+            (self.sent[1].pk, 0)
+        )
+
+        Message.objects.update(is_read=False)
+        migration.flag_read_messages(apps, None)
+        self.assertEqual(list(Message.objects.filter(is_read=True)), self.sent[:2])
+
+
+class MessageStreamTests(TestCase):
+    def setUp(self):
+        self.mentor = User.objects.create_user('mentor', password='pw')
+        self.mentee = User.objects.create_user('mentee', password='pw')
+        self.conversation, _ = Conversation.objects.get_or_create_between(self.mentor, self.mentee)
+        self.message = Message.objects.create(conversation=self.conversation, sender=self.mentee, content='Hi')
+        self.url = reverse('notifications:stream')
+
+    def poll(self, user, **params):
+        self.client.force_login(user)
+        with mock.patch.object(views, 'LONG_POLL_TIMEOUT', 0.05):
+            return self.read(self.client.get(self.url, params)).decode()
+
+    @staticmethod
+    def read(response):
+        """Drain a long-poll response the way the WSGI handler would, minus its warning."""
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(collect)()
+
+    def test_broker_delivers_to_the_users_subscriptions(self):
+        async def receive():
+            broker = InProcessBroker()
+            mine, theirs = broker.subscribe(self.mentor.pk), broker.subscribe(self.mentee.pk)
+            publisher = threading.Thread(target=broker.publish, args=(self.mentor.pk, {'type': 'read'}))
+            publisher.start()
+            publisher.join()
+            event = await asyncio.wait_for(mine.get(), 1)
+            broker.unsubscribe(mine)
+            broker.unsubscribe(theirs)
+            return event, theirs.queue.empty(), dict(broker._subscriptions)
+
+        self.assertEqual(asyncio.run(receive()), ({'type': 'read'}, True, {}))
+
+    async def test_stream_forwards_published_events(self):
+        await self.async_client.aforce_login(self.mentor)
+        response = await self.async_client.get(self.url)
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+
+        get_broker().publish(self.mentor.pk, message_event(self.message))
+        chunk = await asyncio.wait_for(anext(chunks), 5)
+        self.assertTrue(chunk.startswith(f'id: {self.message.pk}\nevent: message'.encode()))
+        await chunks.aclose()
+
+    def test_long_poll_replays_missed_messages_then_times_out(self):
+        replay = self.poll(self.mentor, last_event_id=self.message.pk - 1)
+        self.assertIn(f'id: {self.message.pk}\n', replay)
+        self.assertEqual(self.poll(self.mentor, last_event_id=self.message.pk), 'retry: 3000\n\n')
+
+    def test_long_polls_beyond_the_cap_end_immediately(self):
+        with mock.patch.object(views, '_long_poll_slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            self.client.force_login(self.mentor)
+            response = self.client.get(self.url)  # would otherwise wait LONG_POLL_TIMEOUT
+            self.assertEqual(self.read(response), b'retry: 3000\n\n')
+
+    def test_non_participants_get_nothing(self):
+        outsider = User.objects.create_user('outsider', password='pw')
+        self.assertEqual(self.poll(outsider, last_event_id=0), 'retry: 3000\n\n')
+        read_url = reverse('notifications:conversation_read', args=[self.conversation.pk])
+        self.assertEqual(self.client.post(read_url, {'up_to': self.message.pk}).status_code, 404)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class CanonicalPairMigrationTests(TransactionTestCase):
+    before = [('notifications', '0006_conversation_read_watermarks')]
+    after = [('notifications', '0007_conversation_canonical_pair')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        old_apps = self.executor.loader.project_state(self.before).apps
+        Conversation = old_apps.get_model('notifications', 'Conversation')
+        Message = old_apps.get_model('notifications', 'Message')
+        User = old_apps.get_model('auth', 'User')
+
+        self.low, self.high, self.third = (User.objects.create(username=name) for name in ('low', 'high', 'third'))
+        canonical = Conversation.objects.create(participant1=self.low, participant2=self.high)
+        duplicate = Conversation.objects.create(participant1=self.high, participant2=self.low)
+        self.lone = Conversation.objects.create(participant1=self.third, participant2=self.low,
+                                                participant1_read_watermark=7)
+
+        self.first = Message.objects.create(conversation=canonical, sender=self.low, content='First')
+        self.second = Message.objects.create(conversation=duplicate, sender=self.high, content='Second')
+        self.third_message = Message.objects.create(conversation=duplicate, sender=self.low, content='Third')
+        # high has read "First" in the canonical thread, low has read "Second" in the duplicate
+        Conversation.objects.filter(pk=canonical.pk).update(participant2_read_watermark=self.first.pk)
+        Conversation.objects.filter(pk=duplicate.pk).update(participant2_read_watermark=self.second.pk)
+        self.canonical_pk = canonical.pk
+
+        self.executor.loader.build_graph()
+        self.executor.migrate(self.after)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_threads_are_merged(self):
+        merged = Conversation.objects.get(participant1=self.low.pk, participant2=self.high.pk)
+        self.assertEqual(merged.pk, self.canonical_pk)
+        self.assertEqual(Conversation.objects.count(), 2)
+        self.assertEqual(
+            list(merged.messages.values_list('pk', flat=True)),
+            [self.first.pk, self.second.pk, self.third_message.pk]
+        )
+        self.assertEqual((merged.last_message_id, merged.last_message_preview), (self.third_message.pk, 'Third'))
+        self.assertEqual((merged.participant1_read_watermark, merged.participant2_read_watermark),
+                         (self.second.pk, self.first.pk))
+        self.assertEqual((merged.participant1_unread_count, merged.participant2_unread_count), (0, 1))
+
+        lone = Conversation.objects.get(pk=self.lone.pk)
+        self.assertEqual((lone.participant1_id, lone.participant2_id), (self.low.pk, self.third.pk))
+        self.assertEqual((lone.participant1_read_watermark, lone.participant2_read_watermark), (0, 7))
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.force_login(self.admin)
+        Notification.objects.bulk_create([
+            Notification(recipient=self.admin, notification_type='email', trigger_event='todo_submitted',
+                         subject=f'Notification {i}', message='')
+            for i in range(250)
+        ])
+        self.url = reverse('admin:notifications_notification_changelist')
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            seen.extend(obj.pk for obj in changelist.result_list)
+            url = changelist.next_page_url and self.url + changelist.next_page_url
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_count_is_capped(self):
+        with mock.patch.object(ApproximateCountPaginator, 'count_cap', 100):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count, 100)
+        self.assertContains(response, 'About 100')
+
+    def test_dates_drill_down_by_year_month_and_day(self):
+        last_year = timezone.now().year - 1
+        old = Notification.objects.order_by('pk')[:10].values_list('pk', flat=True)
+        Notification.objects.filter(pk__in=list(old)).update(
+            sent_at=timezone.make_aware(timezone.datetime(last_year, 3, 5, 12))
+        )
+
+        def links(query=''):
+            response = self.client.get(self.url + query)
+            choices = [choice for spec in response.context['cl'].filter_specs
+                       if spec.title == 'sent at' for choice in spec.choices(response.context['cl'])]
+            return response.context['cl'], {choice['display']: choice['query_string'] for choice in choices}
+
+        changelist, years = links()
+        self.assertIn(str(last_year), years)
+        changelist, months = links(years[str(last_year)])
+        self.assertEqual(changelist.result_count, 10)
+        changelist, days = links(months[f'March {last_year}'])
+        self.assertEqual(changelist.result_count, 10)
+        changelist, _ = links(days['March 5'])
+        self.assertEqual(changelist.result_count, 10)
+        changelist, _ = links(days['March 6'])
+        self.assertEqual(changelist.result_count, 0)
+        self.assertEqual(self.client.get(reverse('admin:notifications_message_changelist')).status_code, 200)
+
+    def test_filters_and_column_sorting_still_work(self):
+        response = self.client.get(self.url, {'delivery_status__exact': 'pending', 'o': '3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 250)
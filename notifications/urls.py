@@ -6,7 +6,10 @@ app_name = 'notifications'
 urlpatterns = [
     path('inbox/', views.inbox_view, name='inbox'),
     path('conversation/<int:conversation_id>/', views.conversation_detail_view, name='conversation_detail'),
+    path('conversation/<int:conversation_id>/messages/', views.conversation_messages_view, name='conversation_messages'),
+    path('conversation/<int:conversation_id>/read/', views.conversation_read_view, name='conversation_read'),
     path('start/<str:username>/', views.conversation_start_view, name='conversation_start'),
+    path('stream/', views.message_stream_view, name='stream'),
 
     # Legacy URLs - kept for backwards compatibility
     path('send/<str:username>/', views.message_send_view, name='send'),
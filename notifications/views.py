@@ -1,37 +1,61 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.db.models import Q, F
+from mentorship_platform.pagination import keyset_paginate
 from .models import Conversation, Message
+from .realtime import get_broker, message_event
+
+INBOX_PAGE_SIZE = 25
+MESSAGE_PAGE_SIZE = 50
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+LONG_POLL_TIMEOUT = 25  # seconds a non-ASGI request waits for an event
+MAX_REPLAYED_EVENTS = 100
+
+# Long-polls allowed to hold a WSGI worker thread at the same time
+_long_poll_slots = threading.BoundedSemaphore(getattr(settings, 'NOTIFICATIONS_MAX_LONG_POLLS', 4))
 
 
 @login_required
 def inbox_view(request):
     """Show all conversations for the current user."""
-    # Get all conversations where the user is a participant
-    from django.db.models import Q
-
+    # Unread counts and last message previews are denormalized on the row
     conversations = Conversation.objects.filter(
         Q(participant1=request.user) | Q(participant2=request.user)
-    ).select_related('participant1', 'participant2').order_by('-updated_at')
+    ).select_related('participant1', 'participant2')
 
-    # Annotate conversations with additional data
-    conversation_data = []
-    for conv in conversations:
-        other_user = conv.get_other_participant(request.user)
-        unread_count = conv.messages.filter(is_read=False).exclude(sender=request.user).count()
-        last_msg = conv.messages.last()
+    # Keyset pagination keeps the cost flat however many threads a user has
+    page, next_cursor = keyset_paginate(
+        conversations,
+        ordering=('-updated_at', '-id'),
+        cursor=request.GET.get('cursor'),
+        page_size=INBOX_PAGE_SIZE
+    )
 
+    conversation_data = []
+    for conv in page:
         conversation_data.append({
             'conversation': conv,
-            'other_user': other_user,
-            'unread_count': unread_count,
-            'last_message': last_msg
+            'other_user': conv.get_other_participant(request.user),
+            'unread_count': conv.get_unread_count(request.user),
+            'last_message': conv.last_message_preview
         })
 
     context = {
-        'conversations': conversation_data
+        'conversations': conversation_data,
+        'latest_message_id': max((conv.last_message_id or 0 for conv in page), default=0),
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor')
     }
     return render(request, 'notifications/inbox.html', context)
 
@@ -46,12 +70,17 @@ def conversation_detail_view(request, conversation_id):
         messages.error(request, 'You do not have permission to view this conversation.')
         return redirect('notifications:inbox')
 
-    # Mark messages as read if the user is the recipient (not sender)
-    from django.db.models import Q
-    conversation.messages.filter(~Q(sender=request.user)).update(is_read=True)
+    # Only the most recent window; older pages load through conversation_messages_view
+    page, older_cursor = keyset_paginate(
+        conversation.messages.all(),
+        ordering=('-created_at', '-id'),
+        page_size=MESSAGE_PAGE_SIZE
+    )
+    messages_list = page[::-1]
 
-    # Get all messages in this conversation
-    messages_list = conversation.messages.all()
+    # Mark read only what this page shows; a message arriving meanwhile stays unread
+    if page:
+        conversation.mark_read(request.user, up_to=max(message.id for message in page))
 
     other_user = conversation.get_other_participant(request.user)
 
@@ -71,32 +100,78 @@ def conversation_detail_view(request, conversation_id):
     context = {
         'conversation': conversation,
         'messages': messages_list,
+        'older_cursor': older_cursor,
+        'latest_message_id': conversation.last_message_id or 0,
         'other_user': other_user
     }
     return render(request, 'notifications/conversation_detail.html', context)
 
 
+@login_required
+def conversation_messages_view(request, conversation_id):
+    """
+    Return the page of messages older than the ``before`` cursor.
+
+    Responds with an HTML fragment (next cursor in the X-Next-Cursor header),
+    or JSON when called with ``?format=json``.
+    """
+    conversation = get_object_or_404(
+        Conversation.objects.filter(Q(participant1=request.user) | Q(participant2=request.user)),
+        id=conversation_id
+    )
+
+    page, older_cursor = keyset_paginate(
+        conversation.messages.all(),
+        ordering=('-created_at', '-id'),
+        cursor=request.GET.get('before'),
+        page_size=MESSAGE_PAGE_SIZE
+    )
+    messages_list = page[::-1]
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'messages': [
+                {
+                    'id': message.id,
+                    'sender_id': message.sender_id,
+                    'is_mine': message.sender_id == request.user.id,
+                    'content': message.content,
+                    'created_at': message.created_at.isoformat(),
+                }
+                for message in messages_list
+            ],
+            'next_cursor': older_cursor
+        })
+
+    response = render(request, 'notifications/message_list.html', {
+        'messages': messages_list,
+        'other_user': conversation.get_other_participant(request.user)
+    })
+    if older_cursor:
+        response['X-Next-Cursor'] = older_cursor
+    return response
+
+
 @login_required
 def conversation_start_view(request, username):
     """Start a new conversation with another user."""
-    other_user = get_object_or_404(User, username=username)
+    other_user = get_object_or_404(User.objects.select_related('profile'), username=username)
+    identity = request.identity
 
     # Check if users can message each other
     can_message = False
 
     # Users must be in the same organization
-    if (request.user.profile.organization and
-        other_user.profile.organization and
-        request.user.profile.organization == other_user.profile.organization):
+    if (identity.organization and
+        identity.organization.id == other_user.profile.organization_id):
 
         # Mentees can message mentors
-        if request.user.profile.role == 'mentee':
+        if identity.is_mentee:
             if other_user.profile.role == 'mentor':
                 can_message = True
         # Mentors can message their mentees or other mentors
-        elif request.user.profile.role == 'mentor':
-            mentees = request.user.profile.get_mentees()
-            if (other_user.profile.role == 'mentee' and other_user in [m.user for m in mentees]):
+        elif identity.is_mentor:
+            if other_user.profile.role == 'mentee' and identity.is_mentor_of(other_user):
                 can_message = True
             elif other_user.profile.role == 'mentor':
                 can_message = True
@@ -105,39 +180,131 @@ def conversation_start_view(request, username):
         messages.error(request, 'You can only message people in your organization.')
         return redirect('notifications:inbox')
 
-    # Check if conversation already exists
-    try:
-        # Try to find existing conversation
-        conversation = Conversation.objects.get(
-            Q(participant1=request.user, participant2=other_user) |
-            Q(participant1=other_user, participant2=request.user)
-        )
+    # Look up the thread by its canonical pair (one unique-index probe); the
+    # unique index also stops concurrent clicks from creating duplicates
+    conversation, created = Conversation.objects.get_or_create_between(request.user, other_user)
+    if not created:
         return redirect('notifications:conversation_detail', conversation_id=conversation.id)
-    except Conversation.DoesNotExist:
-        # Create new conversation
-        conversation = Conversation.objects.create(
-            participant1=request.user,
-            participant2=other_user
-        )
-
-        if request.method == 'POST':
-            content = request.POST.get('content', '').strip()
-            if content:
-                Message.objects.create(
-                    conversation=conversation,
-                    sender=request.user,
-                    content=content
-                )
-                messages.success(request, f'Conversation started with {other_user.username}!')
-                return redirect('notifications:conversation_detail', conversation_id=conversation.id)
-            else:
-                messages.error(request, 'Please enter a message.')
-
-        context = {
-            'conversation': conversation,
-            'other_user': other_user
-        }
-        return render(request, 'notifications/conversation_start.html', context)
+
+    if request.method == 'POST':
+        content = request.POST.get('content', '').strip()
+        if content:
+            Message.objects.create(
+                conversation=conversation,
+                sender=request.user,
+                content=content
+            )
+            messages.success(request, f'Conversation started with {other_user.username}!')
+            return redirect('notifications:conversation_detail', conversation_id=conversation.id)
+        else:
+            messages.error(request, 'Please enter a message.')
+
+    context = {
+        'conversation': conversation,
+        'other_user': other_user
+    }
+    return render(request, 'notifications/conversation_start.html', context)
+
+
+@login_required
+@require_POST
+def conversation_read_view(request, conversation_id):
+    """
+    Mark a conversation read while it is open (used by the live-update script).
+
+    ``up_to`` is the id of the newest message the page has displayed.
+    """
+    conversation = get_object_or_404(
+        Conversation.objects.filter(Q(participant1=request.user) | Q(participant2=request.user)),
+        id=conversation_id
+    )
+    up_to = request.POST.get('up_to', '')
+    if not up_to.isdigit():
+        return JsonResponse({'error': 'up_to must be a message id'}, status=400)
+
+    conversation.mark_read(request.user, up_to=int(up_to))
+    return JsonResponse({
+        'conversation_id': conversation.id,
+        'unread_count': conversation.get_unread_count(request.user)
+    })
+
+
+def _missed_message_events(user, last_event_id):
+    """Messages in the user's conversations newer than the last event they saw."""
+    missed = Message.objects.filter(
+        Q(conversation__participant1=user) | Q(conversation__participant2=user),
+        id__gt=last_event_id
+    ).order_by('id')[:MAX_REPLAYED_EVENTS]
+    return [message_event(message) for message in missed]
+
+
+def _format_event(event):
+    data = json.dumps(event)
+    if event['type'] == 'message':
+        return f"id: {event['id']}\nevent: message\ndata: {data}\n\n"
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+@login_required
+async def message_stream_view(request):
+    """
+    Server-sent events stream of new messages and read-state changes.
+
+    Served over ASGI this is a long-lived stream. Under WSGI it degrades to
+    long-polling: the response ends after the first batch of events (or a
+    timeout) and EventSource reconnects, resuming from Last-Event-ID. Each
+    waiting long-poll ties up a worker thread, so only
+    NOTIFICATIONS_MAX_LONG_POLLS wait at once; beyond that the response ends
+    right away and the client polls on its retry interval. Deploy under ASGI
+    for live updates at any real number of users.
+    """
+    user = await request.auser()
+    streaming = isinstance(request, ASGIRequest)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id', '')
+
+    async def events():
+        broker = get_broker()
+        subscription = broker.subscribe(user.pk)
+        waiting = False
+        try:
+            yield 'retry: 3000\n\n'
+
+            if last_event_id.isdigit():
+                missed = await sync_to_async(_missed_message_events)(user, int(last_event_id))
+                for event in missed:
+                    yield _format_event(event)
+                if missed and not streaming:
+                    return
+
+            if not streaming:
+                waiting = _long_poll_slots.acquire(blocking=False)
+                if not waiting:
+                    return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(),
+                        timeout=STREAM_HEARTBEAT if streaming else LONG_POLL_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    if not streaming:
+                        return
+                    yield ': keep-alive\n\n'
+                    continue
+
+                yield _format_event(event)
+                if not streaming:
+                    return
+        finally:
+            if waiting:
+                _long_poll_slots.release()
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 # Keep old URLs working by redirecting
@@ -1,11 +1,13 @@
 from django.contrib import admin
-from .models import DailyReport
+from mentorship_platform.admin_pagination import LargeTableAdmin
+from .models import DailyReport, DailyEngagement
 
 
 @admin.register(DailyReport)
 class DailyReportAdmin(admin.ModelAdmin):
     list_display = ['mentee', 'report_date', 'mood', 'has_mentor_feedback']
     list_filter = ['mood', 'report_date']
+    list_select_related = ['mentee']
     search_fields = ['mentee__username', 'mentee__email', 'achievements', 'next_steps']
     date_hierarchy = 'report_date'
     readonly_fields = ['mentee', 'report_date', 'mood', 'achievements', 'challenges', 'learnings', 'next_steps']
@@ -14,3 +16,20 @@ class DailyReportAdmin(admin.ModelAdmin):
         return bool(obj.mentor_feedback)
     has_mentor_feedback.boolean = True
     has_mentor_feedback.short_description = 'Feedback Given'
+
+
+@admin.register(DailyEngagement)
+class DailyEngagementAdmin(LargeTableAdmin):
+    """Rollup rows are derived data: browsable, but only changed by rebuilding them."""
+    list_display = ['mentee', 'date', 'organization', 'mentor', 'todo_submitted', 'tasks_completed',
+                    'tasks_total', 'report_submitted', 'mood']
+    list_filter = ['todo_submitted', 'report_submitted', 'mood', 'date']
+    list_select_related = ['mentee', 'mentor', 'organization']
+    search_fields = ['mentee__username', 'mentor__username']
+    ordering = ['-date', '-id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,18 @@
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from .services import reconcile_engagement as reconcile
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_engagement():
+    """
+    Rebuild the recent engagement rollups from the raw records.
+    This should be scheduled to run nightly.
+    """
+    days = getattr(settings, 'ENGAGEMENT_RECONCILE_DAYS', 7)
+    written, deleted = reconcile(days, timezone.now().date())
+    logger.info('Engagement reconciled for %d day(s): %d rows written, %d deleted', days, written, deleted)
+    return {'written': written, 'deleted': deleted}
@@ -0,0 +1,80 @@
+import time
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import MentorAssignment
+from todo.models import TodoList
+from reports.models import DailyReport
+
+MODELS = {
+    'reports': (DailyReport, 'report_date'),
+    'todos': (TodoList, 'submission_date'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Fill in the mentor on daily reports and todo lists submitted before it was recorded, '
+            'using the mentor assignment in effect on the submission date.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(MODELS), help='Backfill just one kind of submission')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows updated per transaction')
+
+    def handle(self, *args, **options):
+        for name in [options['only']] if options['only'] else sorted(MODELS):
+            model, date_field = MODELS[name]
+            started = time.monotonic()
+            updated, unmatched = self.backfill(model, date_field, options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {updated} updated, {unmatched} without a mentor at the time '
+                f'({time.monotonic() - started:.1f}s)'
+            ))
+
+    def backfill(self, model, date_field, chunk_size):
+        """Walk the rows missing a mentor in primary key order, one chunk per transaction."""
+        updated = unmatched = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                rows = list(model.objects.filter(mentor__isnull=True, pk__gt=last_pk).order_by('pk').only(
+                    'pk', 'mentee_id', date_field
+                )[:chunk_size])
+                if not rows:
+                    return updated, unmatched
+                last_pk = rows[-1].pk
+
+                history = self.assignment_history({row.mentee_id for row in rows})
+                changed = []
+                for row in rows:
+                    row.mentor_id = self.mentor_on(history.get(row.mentee_id), getattr(row, date_field))
+                    if row.mentor_id is None:
+                        unmatched += 1
+                    else:
+                        changed.append(row)
+                model.objects.bulk_update(changed, ['mentor'])
+                updated += len(changed)
+
+    def assignment_history(self, mentee_user_ids):
+        """Per mentee user id: assignment dates in order, and the mentor user id from each."""
+        history = defaultdict(lambda: ([], []))
+        assignments = MentorAssignment.objects.filter(mentee__user_id__in=mentee_user_ids).order_by(
+            'assigned_at', 'pk'
+        ).values_list('mentee__user_id', 'mentor__user_id', 'assigned_at')
+        for mentee_id, mentor_id, assigned_at in assignments:
+            dates, mentors = history[mentee_id]
+            dates.append(timezone.localdate(assigned_at))
+            mentors.append(mentor_id)
+        return history
+
+    @staticmethod
+    def mentor_on(history, day):
+        """The mentor from the latest assignment made on or before ``day``, if any."""
+        if history is None:
+            return None
+        dates, mentors = history
+        index = bisect_right(dates, day)
+        return mentors[index - 1] if index else None
@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports.services import reconcile_engagement
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily engagement rollups from todo lists and reports. '
+            'Run nightly to catch changes made without signals.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ENGAGEMENT_RECONCILE_DAYS', 7),
+                            help='Days to rebuild, counting back from today')
+        parser.add_argument('--since', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                            help='Rebuild every day from this date on (overrides --days)')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        days = (today - options['since']).days + 1 if options['since'] else options['days']
+        if days < 1:
+            raise CommandError('Nothing to rebuild: the range is empty.')
+
+        written, deleted = reconcile_engagement(days, today)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {days} day(s) of engagement: {written} row(s) written, {deleted} removed.'
+        ))
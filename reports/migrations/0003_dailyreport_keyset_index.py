@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_auto_20260131_0303'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyreport',
+            name='next_steps',
+            field=models.TextField(help_text='Your plans, action items, or goals for the next session/day'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyreport',
+            index=models.Index(fields=['report_date', 'id'], name='report_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_dailyreport_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyreport',
+            index=models.Index(condition=models.Q(('mentor_feedback__isnull', True), ('mentor_feedback', ''), _connector='OR'), fields=['report_date', 'id'], name='report_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_remove_userprofile_mentor_userprofile_bio_and_more'),
+        ('reports', '0005_submission_mentor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('todo_submitted', models.BooleanField(default=False)),
+                ('tasks_total', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('report_submitted', models.BooleanField(default=False)),
+                ('mood', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Very Bad'), (2, 'Bad'), (3, 'Neutral'), (4, 'Good'), (5, 'Very Good')], null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mentee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_engagement', to=settings.AUTH_USER_MODEL)),
+                ('mentor', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mentee_engagement', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_engagement', to='accounts.organization')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily engagement',
+                'indexes': [models.Index(fields=['mentor', 'date'], name='engagement_mentor_date_idx'), models.Index(fields=['organization', 'date'], name='engagement_org_date_idx'), models.Index(fields=['date', 'id'], name='engagement_date_idx')],
+                'unique_together': {('mentee', 'date')},
+            },
+        ),
+    ]
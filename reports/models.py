@@ -1,10 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
+from accounts.models import Organization
+
+# Reports still waiting for mentor feedback, also the condition of the partial index below
+PENDING_FEEDBACK = models.Q(mentor_feedback__isnull=True) | models.Q(mentor_feedback='')
+
 
 class DailyReport(models.Model):
     MOOD_CHOICES = [(1, 'Very Bad'), (2, 'Bad'), (3, 'Neutral'), (4, 'Good'), (5, 'Very Good')]
 
     mentee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_reports')
+    # The mentee's mentor when the report was submitted, so mentor views filter on one column
+    # (db_index=False: the (mentor, date, id) index below serves lookups by mentor)
+    mentor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+                               related_name='mentee_reports')
     report_date = models.DateField(auto_now_add=True)
     mood = models.IntegerField(choices=MOOD_CHOICES)
     achievements = models.TextField()
@@ -14,8 +23,51 @@ class DailyReport(models.Model):
     mentor_feedback = models.TextField(blank=True, null=True)
 
     class Meta:
+        # The unique (mentee, report_date) index also serves per-mentee lookups
         unique_together = ['mentee', 'report_date']
         ordering = ['-report_date']
+        indexes = [
+            models.Index(fields=['report_date', 'id'], name='report_date_id_idx'),
+            models.Index(fields=['mentor', 'report_date', 'id'], name='report_mentor_date_idx'),
+            models.Index(fields=['mentor', 'report_date', 'id'], condition=PENDING_FEEDBACK,
+                         name='report_pending_idx'),
+        ]
 
     def __str__(self):
         return f"Daily Report - {self.mentee.username} ({self.report_date})"
+
+
+class DailyEngagement(models.Model):
+    """
+    One mentee's activity on one day, rolled up from their todo list and report.
+
+    Rows are refreshed when the source records change (see reports.signals)
+    and reconciled nightly, so dashboards aggregate this small table instead
+    of the raw history.
+    """
+    mentee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_engagement')
+    date = models.DateField()
+    # Where the mentee belonged when the row was first written
+    organization = models.ForeignKey(Organization, on_delete=models.SET_NULL, null=True, blank=True,
+                                     db_index=False, related_name='daily_engagement')
+    # The mentor the day's report (or else todo list) was submitted to
+    mentor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+                               related_name='mentee_engagement')
+    todo_submitted = models.BooleanField(default=False)
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    report_submitted = models.BooleanField(default=False)
+    mood = models.PositiveSmallIntegerField(choices=DailyReport.MOOD_CHOICES, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['mentee', 'date']
+        indexes = [
+            models.Index(fields=['mentor', 'date'], name='engagement_mentor_date_idx'),
+            models.Index(fields=['organization', 'date'], name='engagement_org_date_idx'),
+            models.Index(fields=['date', 'id'], name='engagement_date_idx'),
+        ]
+        verbose_name_plural = 'Daily engagement'
+
+    def __str__(self):
+        return f"Engagement - {self.mentee.username} ({self.date})"
@@ -0,0 +1,323 @@
+from datetime import timedelta
+from functools import partial
+from itertools import islice
+from heapq import merge
+
+from django.db import transaction
+from django.db.models import Avg, Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncWeek
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from todo.models import TodoItem, TodoList, PENDING_NOTES
+from .models import DailyEngagement, DailyReport, PENDING_FEEDBACK
+
+REVIEW_QUEUE_LIMIT = 50
+MAX_REVIEWS = 100
+
+REVIEW_KINDS = ('report', 'todo')
+
+
+class InvalidReviews(ValueError):
+    pass
+
+
+def submitted_to(mentor):
+    """
+    Filter for the reports or todo lists ``mentor`` (a User) may still see:
+    those submitted to them by mentees of their current organization. A
+    mentor who has left the organization (see offboard_mentors) matches none.
+    """
+    organization_id = mentor.profile.organization_id
+    if organization_id is None:
+        return Q(pk__in=[])
+    return Q(mentor=mentor, mentee__profile__organization=organization_id)
+
+
+def may_review(identity, submission):
+    """
+    Whether the mentor behind ``identity`` may read and answer a report or
+    todo list: they are the mentee's current mentor, or it was submitted to
+    them and they still belong to the mentee's organization.
+    """
+    if identity.is_mentor_of(submission.mentee_id):
+        return True
+    organization_id = identity.profile.organization_id
+    return (
+        submission.mentor_id == identity.user.pk
+        and organization_id is not None
+        and UserProfile.objects.filter(user=submission.mentee_id, organization=organization_id).exists()
+    )
+
+
+def review_queue(mentor, limit=REVIEW_QUEUE_LIMIT):
+    """
+    Reports without feedback and todo lists without notes, oldest first.
+
+    Each kind is read with one query on its partial index and the two
+    sorted streams are merged in Python. The filters use PENDING_FEEDBACK
+    and PENDING_NOTES as they are: the database only picks a partial index
+    when the query repeats its exact condition.
+
+    Args:
+        mentor: The mentor's User
+        limit: Maximum number of items
+
+    Returns:
+        (items, has_more) where items are dicts with kind, id, date, mentee and url
+    """
+    reports = DailyReport.objects.filter(PENDING_FEEDBACK, submitted_to(mentor)).select_related(
+        'mentee'
+    ).only('report_date', 'mood', 'mentee__username', 'mentee__first_name', 'mentee__last_name').order_by(
+        'report_date', 'id'
+    )[:limit + 1]
+    todos = TodoList.objects.filter(PENDING_NOTES, submitted_to(mentor)).select_related(
+        'mentee'
+    ).only('submission_date', 'mentee__username', 'mentee__first_name', 'mentee__last_name').order_by(
+        'submission_date', 'id'
+    )[:limit + 1]
+
+    items = list(islice(merge(
+        (_report_item(report) for report in reports),
+        (_todo_item(todo_list) for todo_list in todos),
+        key=lambda item: (item['date'], item['kind'], item['id'])
+    ), limit + 1))
+    return items[:limit], len(items) > limit
+
+
+def submit_reviews(mentor, reviews):
+    """
+    Save feedback on several reports and todo lists in one transaction.
+
+    Args:
+        mentor: The mentor's User; items they may not see (see submitted_to) are rejected
+        reviews: Dicts with kind ('report' or 'todo'), id and text
+
+    Returns:
+        Number of items updated
+
+    Raises:
+        InvalidReviews: If an entry is malformed or an item was not
+            submitted to this mentor by a mentee of their organization
+    """
+    if len(reviews) > MAX_REVIEWS:
+        raise InvalidReviews(f'At most {MAX_REVIEWS} reviews per request.')
+
+    texts = {kind: {} for kind in REVIEW_KINDS}
+    for review in reviews:
+        if not isinstance(review, dict) or review.get('kind') not in REVIEW_KINDS:
+            raise InvalidReviews(f'Each review needs a kind: {", ".join(REVIEW_KINDS)}.')
+        if not isinstance(review.get('id'), int) or isinstance(review['id'], bool):
+            raise InvalidReviews('Review ids must be integers.')
+        text = str(review.get('text') or '').strip()
+        if not text:
+            raise InvalidReviews('Review text cannot be empty.')
+        texts[review['kind']][review['id']] = text
+
+    with transaction.atomic():
+        reports = list(DailyReport.objects.filter(submitted_to(mentor), pk__in=texts['report']).only('pk'))
+        todos = list(TodoList.objects.filter(submitted_to(mentor), pk__in=texts['todo']).only('pk'))
+        unknown = [
+            f'{kind} {pk}'
+            for kind, found in (('report', reports), ('todo', todos))
+            for pk in sorted(texts[kind].keys() - {obj.pk for obj in found})
+        ]
+        if unknown:
+            raise InvalidReviews(f'Unknown items: {", ".join(unknown)}')
+
+        for report in reports:
+            report.mentor_feedback = texts['report'][report.pk]
+        for todo_list in todos:
+            todo_list.mentor_notes = texts['todo'][todo_list.pk]
+        DailyReport.objects.bulk_update(reports, ['mentor_feedback'])
+        TodoList.objects.bulk_update(todos, ['mentor_notes'])
+    return len(reports) + len(todos)
+
+
+def _report_item(report):
+    return {
+        'kind': 'report',
+        'id': report.pk,
+        'date': report.report_date,
+        'mentee': report.mentee.get_full_name() or report.mentee.username,
+        'mood': report.get_mood_display(),
+        'url': reverse('reports:mentor_report_detail', args=[report.pk]),
+    }
+
+
+def _todo_item(todo_list):
+    return {
+        'kind': 'todo',
+        'id': todo_list.pk,
+        'date': todo_list.submission_date,
+        'mentee': todo_list.mentee.get_full_name() or todo_list.mentee.username,
+        'url': reverse('todo:mentor_todo_detail', args=[todo_list.pk]),
+    }
+
+
+ENGAGEMENT_FIELDS = ['mentor', 'todo_submitted', 'tasks_total', 'tasks_completed', 'report_submitted', 'mood']
+
+
+def rebuild_engagement(start, end, mentee_ids=None):
+    """
+    Recompute the DailyEngagement rows between two dates (inclusive).
+
+    The todo lists and reports of the period are aggregated in two grouped
+    queries and upserted in one statement; rows left without any source
+    record are deleted. Existing rows keep their organization.
+
+    Args:
+        start, end: Date range
+        mentee_ids: Limit to these mentee user ids (default: everyone)
+
+    Returns:
+        (rows written, rows deleted)
+    """
+    todos = TodoList.objects.filter(submission_date__range=(start, end))
+    reports = DailyReport.objects.filter(report_date__range=(start, end))
+    existing = DailyEngagement.objects.filter(date__range=(start, end))
+    if mentee_ids is not None:
+        todos, reports, existing = (
+            qs.filter(mentee_id__in=mentee_ids) for qs in (todos, reports, existing)
+        )
+
+    rows = {}
+    for todo in todos.values('mentee_id', 'submission_date', 'mentor_id').annotate(
+        total=Count('tasks'), completed=Count('tasks', filter=Q(tasks__status='completed'))
+    ):
+        rows[todo['mentee_id'], todo['submission_date']] = DailyEngagement(
+            mentee_id=todo['mentee_id'], date=todo['submission_date'], mentor_id=todo['mentor_id'],
+            todo_submitted=True, tasks_total=todo['total'], tasks_completed=todo['completed']
+        )
+    for report in reports.values('mentee_id', 'report_date', 'mentor_id', 'mood'):
+        row = rows.setdefault(
+            (report['mentee_id'], report['report_date']),
+            DailyEngagement(mentee_id=report['mentee_id'], date=report['report_date'])
+        )
+        row.report_submitted = True
+        row.mood = report['mood']
+        row.mentor_id = report['mentor_id'] or row.mentor_id
+
+    with transaction.atomic():
+        organizations = dict(UserProfile.objects.filter(
+            user_id__in={mentee_id for mentee_id, _ in rows}
+        ).values_list('user_id', 'organization_id')) if rows else {}
+        for (mentee_id, _), row in rows.items():
+            row.organization_id = organizations.get(mentee_id)
+
+        DailyEngagement.objects.bulk_create(
+            rows.values(), update_conflicts=True, unique_fields=['mentee', 'date'],
+            update_fields=[*ENGAGEMENT_FIELDS, 'updated_at']
+        )
+        stale = [
+            pk for pk, mentee_id, day in existing.values_list('pk', 'mentee_id', 'date')
+            if (mentee_id, day) not in rows
+        ]
+        if stale:
+            DailyEngagement.objects.filter(pk__in=stale).delete()
+    return len(rows), len(stale)
+
+
+def schedule_engagement_refresh(mentee_id, day):
+    """Rebuild one mentee's row for ``day`` once the current transaction commits."""
+    transaction.on_commit(partial(rebuild_engagement, day, day, mentee_ids=[mentee_id]))
+
+
+def refresh_task_counts(**lookup):
+    """
+    Recount tasks_total and tasks_completed on the engagement row of the
+    todo list matching ``lookup`` (e.g. ``pk=...`` or ``tasks__id=...``).
+
+    One UPDATE with correlated counts, run in the caller's transaction, so
+    item writes never rebuild the whole row. A day without a row yet is
+    left to the list's own refresh.
+
+    Returns:
+        The number of rows updated (0 or 1)
+    """
+    todo_list = TodoList.objects.filter(**lookup)
+    tasks = TodoItem.objects.filter(
+        todo_list__mentee=OuterRef('mentee'), todo_list__submission_date=OuterRef('date')
+    ).order_by().values('todo_list')
+    return DailyEngagement.objects.filter(
+        mentee=Subquery(todo_list.values('mentee')[:1]),
+        date=Subquery(todo_list.values('submission_date')[:1])
+    ).update(
+        tasks_total=Coalesce(Subquery(tasks.annotate(count=Count('pk')).values('count')), 0),
+        tasks_completed=Coalesce(
+            Subquery(tasks.filter(status='completed').annotate(count=Count('pk')).values('count')), 0
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def record_report_engagement(report):
+    """
+    Copy a saved report onto its engagement row with one UPDATE, falling
+    back to a full rebuild after the commit when the day has no row yet.
+    """
+    fields = {'report_submitted': True, 'mood': report.mood, 'updated_at': timezone.now()}
+    if report.mentor_id:
+        fields['mentor'] = report.mentor_id
+    if not DailyEngagement.objects.filter(mentee=report.mentee_id, date=report.report_date).update(**fields):
+        schedule_engagement_refresh(report.mentee_id, report.report_date)
+
+
+def reconcile_engagement(days, today):
+    """
+    Rebuild the last ``days`` days of rollups, one day per transaction.
+
+    Catches changes that bypass the signals (queryset updates, raw SQL,
+    restored backups).
+
+    Returns:
+        (rows written, rows deleted)
+    """
+    written = deleted = 0
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        day_written, day_deleted = rebuild_engagement(day, day)
+        written += day_written
+        deleted += day_deleted
+    return written, deleted
+
+
+def engagement_stats(rows):
+    """
+    Totals over DailyEngagement rows.
+
+    Returns:
+        Dict with active_days, todo_lists, reports, tasks_total,
+        tasks_completed, completion_rate (%, or None), avg_mood (or None)
+    """
+    return _with_rates(rows.aggregate(**_engagement_aggregates()))
+
+
+def engagement_by(rows, *fields):
+    """engagement_stats grouped by ``fields``, e.g. 'mentee' or 'week'."""
+    if 'week' in fields:
+        rows = rows.annotate(week=TruncWeek('date'))
+    return [
+        _with_rates(group)
+        for group in rows.values(*fields).annotate(**_engagement_aggregates()).order_by(*fields)
+    ]
+
+
+def _engagement_aggregates():
+    return {
+        'active_days': Count('id'),
+        'todo_lists': Count('id', filter=Q(todo_submitted=True)),
+        'reports': Count('id', filter=Q(report_submitted=True)),
+        'tasks_total': Sum('tasks_total', default=0),
+        'tasks_completed': Sum('tasks_completed', default=0),
+        'avg_mood': Avg('mood'),
+    }
+
+
+def _with_rates(stats):
+    total = stats['tasks_total']
+    stats['completion_rate'] = round(100 * stats['tasks_completed'] / total) if total else None
+    if stats['avg_mood'] is not None:
+        stats['avg_mood'] = round(stats['avg_mood'], 1)
+    return stats
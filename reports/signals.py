@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from todo.models import TodoList, TodoItem
+from .models import DailyReport
+from .services import record_report_engagement, refresh_task_counts, schedule_engagement_refresh
+
+# Routine writes update the affected columns in place; only creating or
+# deleting a day's records rebuilds its row. Bulk writes send no signals,
+# so their callers update the rows themselves and the nightly
+# reconcile_engagement run catches anything else.
+
+@receiver(post_save, sender=DailyReport)
+def update_report_engagement(sender, instance, **kwargs):
+    record_report_engagement(instance)
+
+@receiver(post_delete, sender=DailyReport)
+def refresh_report_engagement(sender, instance, **kwargs):
+    schedule_engagement_refresh(instance.mentee_id, instance.report_date)
+
+@receiver(post_save, sender=TodoList)
+def create_todo_list_engagement(sender, instance, created, **kwargs):
+    # Mentors only edit the notes of an existing list, which the rollup ignores
+    if created:
+        schedule_engagement_refresh(instance.mentee_id, instance.submission_date)
+
+@receiver(post_delete, sender=TodoList)
+def refresh_todo_list_engagement(sender, instance, **kwargs):
+    schedule_engagement_refresh(instance.mentee_id, instance.submission_date)
+
+@receiver(post_save, sender=TodoItem)
+@receiver(post_delete, sender=TodoItem)
+def update_task_counts(sender, instance, **kwargs):
+    # When the whole list is deleted the list's own handler covers the day
+    refresh_task_counts(pk=instance.todo_list_id)
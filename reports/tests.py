@@ -1,3 +1,305 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Organization, MentorAssignment
+from accounts.services import offboard_mentors
+from mentorship_platform.testing import backdate, make_profile
+from todo.models import TodoList, TodoItem
+from todo.services import clean_item, create_todo_list
+from .models import DailyReport, DailyEngagement
+
+
+class MentorReportsTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.mentor = make_profile('mentor', 'mentor', organization)
+        self.today = timezone.now().date()
+        self.mentees = []
+        for i in range(3):
+            mentee = make_profile(f'mentee{i}', 'mentee', organization)
+            MentorAssignment.objects.create(mentee=mentee, mentor=self.mentor)
+            self.mentees.append(mentee.user)
+            for days_ago in (4, 3, 2, 1, 0):
+                report = DailyReport.objects.create(
+                    mentee=mentee.user, mentor=self.mentor.user, mood=days_ago + 1,
+                    achievements='Did things ' * 200, next_steps='More',
+                    mentor_feedback='Nice' if days_ago % 2 else None
+                )
+                backdate(report, 'report_date', days_ago)
+        outsider = make_profile('outsider', 'mentee', organization)
+        DailyReport.objects.create(mentee=outsider.user, mood=3, achievements='x', next_steps='y')
+        self.client.force_login(self.mentor.user)
+        self.url = reverse('reports:mentor_reports')
+
+    def get_all(self, params=None):
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {**(params or {}), **({'cursor': cursor} if cursor else {})})
+            seen += response.context['reports']
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                return seen
+
+    def test_pages_cost_the_same_whatever_the_history(self):
+        with patch('reports.views.MENTOR_REPORTS_PAGE_SIZE', 4):
+            for cursor in (None, self.client.get(self.url).context['next_cursor']):
+                # Session, user, profile, the mentee picker and one page of reports
+                with self.assertNumQueries(5):
+                    self.client.get(self.url, {'cursor': cursor} if cursor else {})
+            reports = self.get_all()
+
+        self.assertEqual(len(reports), 15)
+        keys = [(report.report_date, report.pk) for report in reports]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertTrue(all(len(report.achievements_preview) <= 300 for report in reports))
+
+    def test_filters(self):
+        mentee = self.mentees[0]
+        self.assertEqual({r.mentee_id for r in self.get_all({'mentee': mentee.pk})}, {mentee.pk})
+        self.assertEqual({r.mood for r in self.get_all({'mood_min': 2, 'mood_max': 3})}, {2, 3})
+        self.assertEqual(len(self.get_all({'start': self.today - timedelta(days=1)})), 6)
+
+        pending = self.get_all({'pending': '1'})
+        self.assertEqual(len(pending), 9)
+        self.assertFalse(any(report.has_feedback for report in pending))
+
+        # Someone else's mentee finds nothing
+        outsider = User.objects.get(username='outsider')
+        self.assertEqual(self.get_all({'mentee': outsider.pk}), [])
+
+
+class ReviewQueueTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.mentor = make_profile('mentor', 'mentor', organization)
+        self.mentee = make_profile('mentee', 'mentee', organization)
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=self.mentor)
+
+        self.old_report = DailyReport.objects.create(
+            mentee=self.mentee.user, mentor=self.mentor.user, mood=3, achievements='a', next_steps='b'
+        )
+        backdate(self.old_report, 'report_date', 2)
+        self.reviewed = DailyReport.objects.create(
+            mentee=self.mentee.user, mentor=self.mentor.user, mood=4, achievements='a', next_steps='b',
+            mentor_feedback='Great'
+        )
+        backdate(self.reviewed, 'report_date', 1)
+        self.todo_list = TodoList.objects.create(mentee=self.mentee.user, mentor=self.mentor.user, mentor_notes='')
+
+        outsider = make_profile('outsider', 'mentee', organization)
+        self.foreign = DailyReport.objects.create(mentee=outsider.user, mood=3, achievements='a', next_steps='b')
+
+        self.client.force_login(self.mentor.user)
+        self.api = reverse('reports:review_queue_api')
+
+    def post(self, reviews):
+        return self.client.post(self.api, json.dumps({'reviews': reviews}), content_type='application/json')
+
+    def test_queue_lists_pending_items_oldest_first(self):
+        response = self.client.get(self.api)
+        self.assertEqual(
+            [(item['kind'], item['id']) for item in response.json()['items']],
+            [('report', self.old_report.pk), ('todo', self.todo_list.pk)]
+        )
+        self.assertFalse(response.json()['has_more'])
+        self.assertTrue(self.client.get(self.api, {'limit': 1}).json()['has_more'])
+        self.assertContains(self.client.get(reverse('reports:review_queue')), f'name="todo-{self.todo_list.pk}"')
+
+    def test_bulk_feedback_in_one_post(self):
+        response = self.post([
+            {'kind': 'report', 'id': self.old_report.pk, 'text': 'Keep going'},
+            {'kind': 'todo', 'id': self.todo_list.pk, 'text': 'Good plan'},
+        ])
+        self.assertEqual(response.json(), {'updated': 2})
+        self.assertEqual(self.client.get(self.api).json()['items'], [])
+        self.old_report.refresh_from_db()
+        self.assertEqual(self.old_report.mentor_feedback, 'Keep going')
+
+        response = self.client.post(reverse('reports:review_queue'), {f'report-{self.reviewed.pk}': 'Even better'})
+        self.assertRedirects(response, reverse('reports:review_queue'))
+        self.reviewed.refresh_from_db()
+        self.assertEqual(self.reviewed.mentor_feedback, 'Even better')
+
+    def test_rejects_other_mentors_items_and_bad_payloads(self):
+        response = self.post([
+            {'kind': 'report', 'id': self.old_report.pk, 'text': 'Fine'},
+            {'kind': 'report', 'id': self.foreign.pk, 'text': 'Sneaky'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.old_report.refresh_from_db()
+        self.assertIsNone(self.old_report.mentor_feedback)
+        self.assertEqual(self.post([{'kind': 'memo', 'id': 1, 'text': 'x'}]).status_code, 400)
+        self.assertEqual(self.post([{'kind': 'todo', 'id': self.todo_list.pk, 'text': ' '}]).status_code, 400)
+        self.assertEqual(self.client.post(self.api, 'nope', content_type='application/json').status_code, 400)
+
+
+class SubmissionMentorTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.first = make_profile('first', 'mentor', organization)
+        self.second = make_profile('second', 'mentor', organization)
+        self.mentee = make_profile('mentee', 'mentee', organization)
+
+    def test_reports_keep_the_mentor_they_were_submitted_to(self):
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=self.first)
+        self.client.force_login(self.mentee.user)
+        self.client.post(reverse('reports:create'), {'mood': 4, 'achievements': 'a', 'next_steps': 'b'})
+        report = DailyReport.objects.get()
+        self.assertEqual(report.mentor, self.first.user)
+
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=self.second)
+        self.client.force_login(self.first.user)
+        response = self.client.get(reverse('reports:mentor_reports'))
+        self.assertEqual(list(response.context['reports']), [report])
+        self.assertEqual(list(response.context['mentees']), [self.mentee.user])
+        self.client.force_login(self.second.user)
+        self.assertEqual(list(self.client.get(reverse('reports:mentor_reports')).context['reports']), [])
+
+    def test_offboarded_mentor_loses_access_to_past_submissions(self):
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=self.first)
+        report = DailyReport.objects.create(mentee=self.mentee.user, mentor=self.first.user, mood=3,
+                                            achievements='a', next_steps='b')
+        todo_list, _ = create_todo_list(self.mentee.user, [clean_item({'title': 'Read'})], mentor=self.first)
+        offboard_mentors([self.first])
+
+        self.client.force_login(self.first.user)
+        report_url = reverse('reports:mentor_report_detail', args=[report.pk])
+        todo_url = reverse('todo:mentor_todo_detail', args=[todo_list.pk])
+        self.assertRedirects(self.client.get(report_url), reverse('reports:mentor_reports'))
+        self.client.post(report_url, {'mentor_feedback': 'Still here'})
+        self.client.post(todo_url, {'mentor_notes': 'Still here'})
+        self.client.post(reverse('reports:review_queue'), {f'report-{report.pk}': 'Still here'})
+        report.refresh_from_db()
+        todo_list.refresh_from_db()
+        self.assertEqual((report.mentor_feedback, todo_list.mentor_notes), (None, None))
+
+        response = self.client.get(reverse('reports:mentor_reports'))
+        self.assertEqual((list(response.context['reports']), list(response.context['mentees'])), ([], []))
+        self.assertEqual(self.client.get(reverse('reports:review_queue_api')).json()['items'], [])
+
+        # The mentee's new mentor takes over
+        self.client.force_login(self.second.user)
+        self.assertEqual(self.client.get(report_url).status_code, 200)
+
+    def test_backfill_uses_the_assignment_in_effect_on_the_submission_date(self):
+        first = MentorAssignment.objects.create(mentee=self.mentee, mentor=self.first)
+        second = MentorAssignment.objects.create(mentee=self.mentee, mentor=self.second)
+        MentorAssignment.objects.filter(pk=first.pk).update(assigned_at=timezone.now() - timedelta(days=10))
+        MentorAssignment.objects.filter(pk=second.pk).update(assigned_at=timezone.now() - timedelta(days=3))
+
+        expected = {}
+        for days_ago, mentor in ((12, None), (5, self.first.user), (1, self.second.user)):
+            report = DailyReport.objects.create(mentee=self.mentee.user, mood=3, achievements='a', next_steps='b')
+            backdate(report, 'report_date', days_ago)
+            todo_list = TodoList.objects.create(mentee=self.mentee.user)
+            backdate(todo_list, 'submission_date', days_ago)
+            expected[report.pk, todo_list.pk] = mentor
+
+        call_command('backfill_submission_mentors', chunk_size=2, stdout=StringIO())
+        for (report_pk, todo_pk), mentor in expected.items():
+            self.assertEqual(DailyReport.objects.get(pk=report_pk).mentor, mentor)
+            self.assertEqual(TodoList.objects.get(pk=todo_pk).mentor, mentor)
+
+
+class EngagementRollupTests(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Academy')
+        self.mentor = make_profile('mentor', 'mentor', self.organization)
+        self.mentee = make_profile('mentee', 'mentee', self.organization)
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=self.mentor)
+        self.today = timezone.now().date()
+        self.client.force_login(self.mentee.user)
+
+    def submit_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('todo:create'), {
+                'item_count': 2, 'title_0': 'Read', 'priority_0': 'high', 'title_1': 'Write', 'priority_1': 'low'
+            })
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('reports:create'), {'mood': 4, 'achievements': 'a', 'next_steps': 'b'})
+        item = TodoItem.objects.filter(todo_list__mentee=self.mentee.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('todo:toggle_item', args=[item.pk]))
+
+    def test_rows_follow_submissions(self):
+        self.submit_day()
+        row = DailyEngagement.objects.get()
+        self.assertEqual(
+            (row.date, row.organization, row.mentor, row.todo_submitted, row.tasks_total, row.tasks_completed,
+             row.report_submitted, row.mood),
+            (self.today, self.organization, self.mentor.user, True, 2, 1, True, 4)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyReport.objects.get().delete()
+        row.refresh_from_db()
+        self.assertEqual((row.report_submitted, row.mood), (False, None))
+        with self.captureOnCommitCallbacks(execute=True):
+            TodoList.objects.get().delete()
+        self.assertFalse(DailyEngagement.objects.exists())
+
+    def test_routine_writes_update_the_row_in_place(self):
+        self.submit_day()
+        report = DailyReport.objects.get()
+        report.mood = 2
+        item = TodoItem.objects.filter(status='pending').first()
+
+        # One UPDATE of the report plus one of its engagement row
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+            report.save()
+        # One UPDATE of the item plus one recount on the engagement row
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+            item.status = 'completed'
+            item.save()
+
+        row = DailyEngagement.objects.get()
+        self.assertEqual((row.mood, row.tasks_completed, row.report_submitted), (2, 2, True))
+
+    def test_report_on_a_day_with_a_todo_list_updates_its_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_todo_list(self.mentee.user, [clean_item({'title': 'Read'})], mentor=self.mentor)
+
+        # The report INSERT plus one UPDATE of the day's engagement row
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+            DailyReport.objects.create(mentee=self.mentee.user, mentor=self.mentor.user, mood=5,
+                                       achievements='a', next_steps='b')
+
+        row = DailyEngagement.objects.get()
+        self.assertEqual((row.todo_submitted, row.report_submitted, row.mood), (True, True, 5))
+
+    def test_reconcile_repairs_changes_made_without_signals(self):
+        self.submit_day()
+        DailyReport.objects.update(mood=1)
+        TodoItem.objects.update(status='completed')
+        DailyEngagement.objects.create(mentee=self.mentor.user, date=self.today)  # no source rows
+
+        out = StringIO()
+        call_command('reconcile_engagement', days=2, stdout=out)
+        self.assertIn('1 row(s) written, 1 removed', out.getvalue())
+        row = DailyEngagement.objects.get()
+        self.assertEqual((row.mood, row.tasks_completed, row.organization), (1, 2, self.organization))
+
+    def test_dashboards_read_the_rollups(self):
+        self.submit_day()
+        self.client.force_login(self.mentor.user)
+        response = self.client.get(reverse('accounts:mentor_dashboard'))
+        self.assertEqual(response.context['engagement'], {
+            'active_days': 1, 'todo_lists': 1, 'reports': 1, 'tasks_total': 2, 'tasks_completed': 1,
+            'avg_mood': 4.0, 'completion_rate': 50
+        })
+        self.assertEqual(response.context['mentees'][0].engagement['reports'], 1)
+        self.assertEqual(len(response.context['weekly_engagement']), 1)
+
+        response = self.client.get(reverse('accounts:organization_detail', args=[self.organization.pk]))
+        self.assertEqual(response.context['engagement']['tasks_total'], 2)
 
-# Create your tests here.
+        self.client.force_login(self.mentee.user)
+        self.assertContains(self.client.get(reverse('accounts:mentee_dashboard')), 'Your Last 28 Days')
@@ -8,4 +8,6 @@ urlpatterns = [
     path('today/', views.report_today_view, name='today'),
     path('mentor/reports/', views.mentor_reports_view, name='mentor_reports'),
     path('mentor/reports/<int:report_id>/', views.mentor_report_detail_view, name='mentor_report_detail'),
+    path('mentor/review/', views.review_queue_view, name='review_queue'),
+    path('mentor/review/items/', views.review_queue_api_view, name='review_queue_api'),
 ]
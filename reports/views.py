@@ -1,14 +1,30 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.contrib import messages
-from .models import DailyReport
+from django.contrib.auth.models import User
+from django.db.models.functions import Left
+from django.utils.http import urlencode
+from mentorship_platform.filters import date_range, int_param
+from mentorship_platform.pagination import keyset_paginate
+from .models import DailyReport, PENDING_FEEDBACK
+from .services import (
+    MAX_REVIEWS, REVIEW_KINDS, InvalidReviews, may_review, review_queue, submit_reviews, submitted_to
+)
 from notifications.services import NotificationService
 
+MENTOR_REPORTS_PAGE_SIZE = 20
+# Characters of each text field loaded for the list cards
+PREVIEW_LENGTH = 300
+
 
 @login_required
 def report_create_view(request):
-    if request.user.profile.role != 'mentee':
+    if not request.identity.is_mentee:
         messages.error(request, 'Only mentees can submit reports.')
         return redirect('accounts:profile')
 
@@ -24,8 +40,10 @@ def report_create_view(request):
         return redirect('reports:today')
 
     if request.method == 'POST':
+        current_mentor = request.identity.current_mentor
         report = DailyReport.objects.create(
             mentee=request.user,
+            mentor_id=current_mentor.user_id if current_mentor else None,
             mood=int(request.POST.get('mood', 3)),
             achievements=request.POST.get('achievements', ''),
             challenges=request.POST.get('challenges', ''),
@@ -36,7 +54,6 @@ def report_create_view(request):
         messages.success(request, 'Daily report submitted successfully!')
 
         # Notify mentor if assigned
-        current_mentor = request.user.profile.get_current_mentor()
         if current_mentor:
             NotificationService.send_notification(
                 recipient=current_mentor.user,
@@ -54,7 +71,7 @@ def report_create_view(request):
 
 @login_required
 def report_today_view(request):
-    if request.user.profile.role != 'mentee':
+    if not request.identity.is_mentee:
         return redirect('accounts:profile')
 
     today = timezone.now().date()
@@ -72,33 +89,77 @@ def report_today_view(request):
 
 @login_required
 def mentor_reports_view(request):
-    if request.user.profile.role != 'mentor':
+    """
+    Mentees' reports, newest first, one keyset page at a time.
+
+    Filters: ``mentee`` (user id), ``mood_min``/``mood_max``, ``date`` or
+    ``start``/``end``, and ``pending=1`` for reports still awaiting feedback.
+    Only short previews of the text fields are loaded.
+    """
+    if not request.identity.is_mentor:
         return redirect('accounts:profile')
 
-    mentees = request.user.profile.get_mentees()
-    mentee_ids = [m.user.id for m in mentees]
-
-    # Get recent reports from all mentees
-    reports = DailyReport.objects.filter(
-        mentee_id__in=mentee_ids
-    ).select_related('mentee').order_by('-report_date')
-
+    moods = {value for value, _ in DailyReport.MOOD_CHOICES}
+
+    mentee_id = int_param(request.GET, 'mentee')
+    mood_min = int_param(request.GET, 'mood_min', choices=moods)
+    mood_max = int_param(request.GET, 'mood_max', choices=moods)
+    start, end = date_range(request.GET)
+    pending = request.GET.get('pending') == '1'
+
+    reports = DailyReport.objects.filter(submitted_to(request.user))
+    if mentee_id:
+        reports = reports.filter(mentee_id=mentee_id)
+    if mood_min:
+        reports = reports.filter(mood__gte=mood_min)
+    if mood_max:
+        reports = reports.filter(mood__lte=mood_max)
+    if start:
+        reports = reports.filter(report_date__gte=start)
+    if end:
+        reports = reports.filter(report_date__lte=end)
+    if pending:
+        reports = reports.filter(PENDING_FEEDBACK)
+
+    reports = reports.select_related('mentee').only(
+        'report_date', 'mood', 'mentee__username', 'mentee__first_name', 'mentee__last_name'
+    ).annotate(
+        achievements_preview=Left('achievements', PREVIEW_LENGTH),
+        next_steps_preview=Left('next_steps', PREVIEW_LENGTH),
+        has_feedback=~PENDING_FEEDBACK
+    )
+    reports, next_cursor = keyset_paginate(
+        reports, ('-report_date', '-id'), cursor=request.GET.get('cursor'), page_size=MENTOR_REPORTS_PAGE_SIZE
+    )
+
+    filters = {
+        'mentee': mentee_id, 'mood_min': mood_min, 'mood_max': mood_max,
+        'start': start, 'end': end, 'pending': '1' if pending else None
+    }
     context = {
-        'reports': reports
+        'reports': reports,
+        # Everyone in the organization who submitted to this mentor, including former mentees
+        'mentees': User.objects.filter(
+            id__in=DailyReport.objects.filter(submitted_to(request.user)).values('mentee')
+        ).only('username', 'first_name', 'last_name').order_by('username'),
+        'filters': filters,
+        'filter_query': urlencode({name: value for name, value in filters.items() if value}),
+        'moods': DailyReport.MOOD_CHOICES,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor')
     }
     return render(request, 'reports/mentor_reports.html', context)
 
 
 @login_required
 def mentor_report_detail_view(request, report_id):
-    if request.user.profile.role != 'mentor':
+    if not request.identity.is_mentor:
         return redirect('accounts:profile')
 
     report = get_object_or_404(DailyReport, id=report_id)
 
-    # Verify this report belongs to one of the mentor's mentees
-    mentee_ids = [m.user.id for m in request.user.profile.get_mentees()]
-    if report.mentee_id not in mentee_ids:
+    # Verify this report is by a current mentee or was submitted to this mentor within the organization
+    if not may_review(request.identity, report):
         messages.error(request, 'You can only view reports of your mentees.')
         return redirect('reports:mentor_reports')
 
@@ -113,3 +174,67 @@ def mentor_report_detail_view(request, report_id):
         'report': report
     }
     return render(request, 'reports/mentor_report_detail.html', context)
+
+
+@login_required
+def review_queue_view(request):
+    """
+    Everything still waiting for the mentor's feedback, oldest first.
+
+    Each row has a feedback box; POST saves every filled-in box at once.
+    """
+    if not request.identity.is_mentor:
+        return redirect('accounts:profile')
+
+    if request.method == 'POST':
+        reviews = []
+        for name, text in request.POST.items():
+            kind, _, pk = name.partition('-')
+            if kind in REVIEW_KINDS and pk.isdigit() and text.strip():
+                reviews.append({'kind': kind, 'id': int(pk), 'text': text})
+        try:
+            updated = submit_reviews(request.user, reviews)
+        except InvalidReviews as e:
+            messages.error(request, str(e))
+        else:
+            if updated:
+                messages.success(request, f'Saved feedback on {updated} item{"s" if updated != 1 else ""}.')
+            else:
+                messages.info(request, 'Write some feedback before saving.')
+        return redirect('reports:review_queue')
+
+    items, has_more = review_queue(request.user)
+    context = {
+        'items': items,
+        'has_more': has_more
+    }
+    return render(request, 'reports/review_queue.html', context)
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def review_queue_api_view(request):
+    """
+    JSON review queue.
+
+    GET returns ``{"items": [...], "has_more": bool}`` (``?limit=`` up to
+    MAX_REVIEWS). POST ``{"reviews": [{"kind": "report"|"todo", "id": ...,
+    "text": ...}]}`` saves all of them in one transaction.
+    """
+    if not request.identity.is_mentor:
+        return JsonResponse({'error': 'Only mentors have a review queue.'}, status=403)
+
+    if request.method == 'GET':
+        limit = int_param(request.GET, 'limit', choices=range(1, MAX_REVIEWS + 1))
+        items, has_more = review_queue(request.user, **({'limit': limit} if limit else {}))
+        return JsonResponse({'items': items, 'has_more': has_more})
+
+    try:
+        reviews = json.loads(request.body)['reviews']
+        if not isinstance(reviews, list):
+            raise InvalidReviews('"reviews" must be a list.')
+        updated = submit_reviews(request.user, reviews)
+    except (ValueError, KeyError, TypeError) as e:
+        message = str(e) if isinstance(e, InvalidReviews) else 'Expected a JSON object with a "reviews" list.'
+        return JsonResponse({'error': message}, status=400)
+    return JsonResponse({'updated': updated})
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import TodoList, TodoItem
 
 
@@ -12,17 +13,23 @@ class TodoItemInline(admin.TabularInline):
 class TodoListAdmin(admin.ModelAdmin):
     list_display = ['mentee', 'submission_date', 'is_submitted_to_mentor', 'get_task_count']
     list_filter = ['submission_date', 'is_submitted_to_mentor']
+    list_select_related = ['mentee']
     search_fields = ['mentee__username', 'mentee__email']
     date_hierarchy = 'submission_date'
     inlines = [TodoItemInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(task_count=Count('tasks'))
+
     def get_task_count(self, obj):
-        return obj.tasks.count()
+        return obj.task_count
     get_task_count.short_description = 'Tasks'
+    get_task_count.admin_order_field = 'task_count'
 
 
 @admin.register(TodoItem)
 class TodoItemAdmin(admin.ModelAdmin):
     list_display = ['title', 'todo_list', 'priority', 'status']
     list_filter = ['priority', 'status']
+    list_select_related = ['todo_list__mentee']
     search_fields = ['title', 'todo_list__mentee__username']
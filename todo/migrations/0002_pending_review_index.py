@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(condition=models.Q(('mentor_notes__isnull', True), ('mentor_notes', ''), _connector='OR'), fields=['submission_date', 'id'], name='todolist_pending_idx'),
+        ),
+    ]
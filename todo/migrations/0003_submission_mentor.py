@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0002_pending_review_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='todolist',
+            name='todolist_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='mentor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mentee_todo_lists', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['mentor', 'submission_date', 'id'], name='todolist_mentor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(condition=models.Q(('mentor_notes__isnull', True), ('mentor_notes', ''), _connector='OR'), fields=['mentor', 'submission_date', 'id'], name='todolist_pending_idx'),
+        ),
+    ]
@@ -1,14 +1,27 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+# Lists the mentor has not added notes to yet, also the condition of the partial index below
+PENDING_NOTES = models.Q(mentor_notes__isnull=True) | models.Q(mentor_notes='')
+
+
 class TodoList(models.Model):
     mentee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='todo_lists')
+    # The mentee's mentor when the list was submitted, so mentor views filter on one column
+    # (db_index=False: the (mentor, date, id) index below serves lookups by mentor)
+    mentor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+                               related_name='mentee_todo_lists')
     submission_date = models.DateField(auto_now_add=True)
     is_submitted_to_mentor = models.BooleanField(default=False)
     mentor_notes = models.TextField(blank=True, null=True)
 
     class Meta:
         unique_together = ['mentee', 'submission_date']
+        indexes = [
+            models.Index(fields=['mentor', 'submission_date', 'id'], name='todolist_mentor_date_idx'),
+            models.Index(fields=['mentor', 'submission_date', 'id'], condition=PENDING_NOTES,
+                         name='todolist_pending_idx'),
+        ]
 
     def __str__(self):
         return f"Todo List - {self.mentee.username} ({self.submission_date})"
@@ -0,0 +1,131 @@
+from django.db import IntegrityError, transaction
+from notifications.services import NotificationService
+from reports.services import refresh_task_counts
+from .models import TodoList, TodoItem
+
+MAX_ITEMS = 100
+
+PRIORITIES = {value for value, _ in TodoItem.PRIORITY_CHOICES}
+STATUSES = {value for value, _ in TodoItem.STATUS_CHOICES}
+TITLE_MAX_LENGTH = TodoItem._meta.get_field('title').max_length
+
+
+class InvalidTodoItems(ValueError):
+    pass
+
+
+def clean_item(item):
+    """
+    Validate one item from a form or JSON payload.
+
+    Returns:
+        Dict with title, priority and status (and id when given)
+
+    Raises:
+        InvalidTodoItems: If a field is missing or has an invalid value
+    """
+    if not isinstance(item, dict):
+        raise InvalidTodoItems('Each item must be an object.')
+    title = str(item.get('title') or '').strip()
+    if not title:
+        raise InvalidTodoItems('Every item needs a title.')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise InvalidTodoItems(f'Titles are limited to {TITLE_MAX_LENGTH} characters.')
+
+    cleaned = {
+        'title': title,
+        'priority': item.get('priority') or 'medium',
+        'status': item.get('status') or 'pending',
+    }
+    if cleaned['priority'] not in PRIORITIES:
+        raise InvalidTodoItems(f"Unknown priority {cleaned['priority']!r}.")
+    if cleaned['status'] not in STATUSES:
+        raise InvalidTodoItems(f"Unknown status {cleaned['status']!r}.")
+    if item.get('id') is not None:
+        if not isinstance(item['id'], int) or isinstance(item['id'], bool):
+            raise InvalidTodoItems('Item ids must be integers.')
+        cleaned['id'] = item['id']
+    return cleaned
+
+
+def create_todo_list(mentee, items, mentor=None):
+    """
+    Create today's todo list with all of its items in one transaction.
+
+    The items are written with a single bulk INSERT. A duplicate submit
+    (double click, retried request) hits the unique (mentee, submission_date)
+    constraint and returns the list that already exists instead.
+
+    Args:
+        mentee: The mentee's User
+        items: Cleaned item dicts (see clean_item)
+        mentor: The mentee's current mentor profile, recorded on the list and
+            notified when it is created
+
+    Returns:
+        (todo_list, created)
+    """
+    todo_list = TodoList(mentee=mentee, mentor_id=mentor.user_id if mentor else None)
+    try:
+        with transaction.atomic():
+            todo_list.save()
+            TodoItem.objects.bulk_create([
+                TodoItem(todo_list=todo_list, title=item['title'], priority=item['priority'], status=item['status'])
+                for item in items
+            ])
+    except IntegrityError:
+        # submission_date was filled in by auto_now_add before the INSERT failed
+        return TodoList.objects.get(mentee=mentee, submission_date=todo_list.submission_date), False
+
+    if mentor is not None:
+        _notify_mentor(mentee, mentor)
+    return todo_list, True
+
+
+def sync_todo_items(todo_list, items):
+    """
+    Make a todo list's items match ``items`` exactly, in one transaction.
+
+    Items with an id are updated (one bulk UPDATE), items without one are
+    created (one bulk INSERT) and items left out are deleted.
+
+    Raises:
+        InvalidTodoItems: If an id does not belong to this list
+    """
+    with transaction.atomic():
+        ids = [item['id'] for item in items if 'id' in item]
+        if len(ids) != len(set(ids)):
+            raise InvalidTodoItems('Each item id may only appear once.')
+        existing = {item.pk: item for item in todo_list.tasks.select_for_update()}
+        unknown = set(ids) - existing.keys()
+        if unknown:
+            raise InvalidTodoItems(f'Unknown item ids: {sorted(unknown)}')
+
+        updated, created = [], []
+        for item in items:
+            if 'id' in item:
+                task = existing.pop(item['id'])
+                task.title, task.priority, task.status = item['title'], item['priority'], item['status']
+                updated.append(task)
+            else:
+                created.append(TodoItem(
+                    todo_list=todo_list, title=item['title'], priority=item['priority'], status=item['status']
+                ))
+
+        if existing:
+            TodoItem.objects.filter(pk__in=existing).delete()
+        TodoItem.objects.bulk_update(updated, ['title', 'priority', 'status'])
+        TodoItem.objects.bulk_create(created)
+        # Bulk writes send no signals
+        refresh_task_counts(pk=todo_list.pk)
+
+
+def _notify_mentor(mentee, mentor):
+    NotificationService.send_notification(
+        recipient=mentor.user,
+        trigger_event='todo_submitted',
+        subject=f'Todo List Submitted by {mentee.username}',
+        message=f'{mentee.username} has created their daily todo list. '
+               f'Please review it on the mentor dashboard.',
+        notification_type='email'
+    )
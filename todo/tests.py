@@ -1,3 +1,177 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Organization, MentorAssignment
+from mentorship_platform.testing import backdate, make_profile
+from notifications.models import Notification
+from .models import TodoList, TodoItem
+from .services import clean_item, create_todo_list
+
+
+class TodoCreateTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        mentor = make_profile('mentor', 'mentor', organization)
+        self.mentee = make_profile('mentee', 'mentee', organization)
+        MentorAssignment.objects.create(mentee=self.mentee, mentor=mentor)
+        self.client.force_login(self.mentee.user)
+
+    def test_items_are_written_in_one_insert(self):
+        data = {'item_count': 20}
+        for i in range(20):
+            data[f'title_{i}'] = f'Task {i}'
+            data[f'priority_{i}'] = 'high'
+
+        response = self.client.post(reverse('todo:create'), data)
+        self.assertRedirects(response, reverse('todo:today'))
+        self.assertEqual(TodoItem.objects.filter(todo_list__mentee=self.mentee.user).count(), 20)
+        self.assertEqual(Notification.objects.filter(trigger_event='todo_submitted').count(), 1)
+
+        other = User.objects.create_user('other')
+        # Savepoint, list INSERT, items INSERT, release, then the new day's engagement row is built once
+        with self.assertNumQueries(11), self.captureOnCommitCallbacks(execute=True):
+            create_todo_list(other, [clean_item({'title': 'x'})] * 20)
+
+    def test_duplicate_submit_returns_existing_list(self):
+        first, created = create_todo_list(self.mentee.user, [clean_item({'title': 'First'})])
+        self.assertTrue(created)
+        second, created = create_todo_list(self.mentee.user, [clean_item({'title': 'Second'})])
+        self.assertFalse(created)
+        self.assertEqual(first, second)
+        self.assertEqual(list(second.tasks.values_list('title', flat=True)), ['First'])
+
+
+class TodoBatchTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.mentee = make_profile('mentee', 'mentee', organization)
+        self.client.force_login(self.mentee.user)
+        self.url = reverse('todo:batch')
+
+    def post(self, items):
+        return self.client.post(self.url, json.dumps({'items': items}), content_type='application/json')
+
+    def test_create_then_replace(self):
+        response = self.post([{'title': 'Read'}, {'title': 'Write', 'priority': 'high'}])
+        self.assertEqual(response.status_code, 201)
+        read, write = response.json()['items']
+
+        response = self.post([
+            {'id': write['id'], 'title': 'Write more', 'priority': 'high', 'status': 'completed'},
+            {'title': 'Review'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['title'], item['status']) for item in response.json()['items']],
+            [('Write more', 'completed'), ('Review', 'pending')]
+        )
+        self.assertFalse(TodoItem.objects.filter(pk=read['id']).exists())
+        self.assertEqual(TodoList.objects.count(), 1)
+
+    def test_rejects_invalid_items(self):
+        self.assertEqual(self.post([{'title': ''}]).status_code, 400)
+        self.assertEqual(self.post([{'title': 'x', 'priority': 'urgent'}]).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.post([{'title': 'Read'}])
+        self.assertEqual(self.post([{'id': 999, 'title': 'x'}]).status_code, 400)
+        self.assertEqual(TodoItem.objects.get().title, 'Read')
+
+
+class TodoToggleTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.mentee = make_profile('mentee', 'mentee', organization)
+        self.todo_list, _ = create_todo_list(self.mentee.user, [clean_item({'title': f'Task {i}'}) for i in range(3)])
+        self.item = self.todo_list.tasks.first()
+        self.client.force_login(self.mentee.user)
+
+    def toggle(self, item_id):
+        return self.client.post(reverse('todo:toggle_item', args=[item_id]) + '?format=json')
+
+    def test_toggle_returns_status_and_counts(self):
+        # Session and user lookups, the conditional UPDATE, the engagement UPDATE and one aggregate
+        with self.assertNumQueries(5), self.captureOnCommitCallbacks(execute=True):
+            response = self.toggle(self.item.id)
+        self.assertEqual(response.json(), {
+            'id': self.item.id, 'status': 'completed', 'completed_count': 1, 'total_count': 3
+        })
+        self.assertEqual(self.toggle(self.item.id).json()['status'], 'pending')
+
+    def test_posting_the_target_status_twice_keeps_it(self):
+        url = reverse('todo:toggle_item', args=[self.item.id]) + '?format=json'
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'status': 'completed'}).json()['status'], 'completed')
+        self.assertContains(self.client.get(reverse('todo:today')), 'name="status" value="pending"')
+
+    def test_cannot_toggle_someone_elses_item(self):
+        other = User.objects.create_user('other', password='pw')
+        self.client.force_login(other)
+        self.assertEqual(self.toggle(self.item.id).status_code, 404)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, 'pending')
+
+    def test_form_post_redirects_and_get_is_rejected(self):
+        url = reverse('todo:toggle_item', args=[self.item.id])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertRedirects(self.client.post(url), reverse('todo:today'))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, 'completed')
+
+
+class MentorTodosTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name='Academy')
+        self.mentor = make_profile('mentor', 'mentor', organization)
+        self.today = timezone.now().date()
+        for i in range(6):
+            mentee = make_profile(f'mentee{i}', 'mentee', organization)
+            MentorAssignment.objects.create(mentee=mentee, mentor=self.mentor)
+            for days_ago in (2, 1, 0):
+                todo_list, _ = create_todo_list(mentee.user, [clean_item({'title': 'x'})], mentor=self.mentor)
+                backdate(todo_list, 'submission_date', days_ago)
+        TodoItem.objects.filter(pk__in=TodoItem.objects.values('pk')[:4]).update(status='completed')
+        outsider = make_profile('outsider', 'mentee', organization)
+        create_todo_list(outsider.user, [clean_item({'title': 'x'})])
+        self.client.force_login(self.mentor.user)
+        self.url = reverse('todo:mentor_todos')
+
+    def test_defaults_to_today_with_annotated_counts(self):
+        response = self.client.get(self.url)
+        todos = response.context['todos']
+        self.assertEqual(len(todos), 6)
+        self.assertEqual({todo.submission_date for todo in todos}, {self.today})
+        self.assertEqual(sum(todo.completed_count for todo in todos),
+                         TodoItem.objects.filter(todo_list__in=todos, status='completed').count())
+        self.assertTrue(all(todo.total_count == 1 for todo in todos))
+
+    def test_date_range_pages_with_fixed_query_budget(self):
+        start = self.today - timedelta(days=2)
+        params = {'start': start.isoformat(), 'end': self.today.isoformat()}
+
+        seen = []
+        with patch('todo.views.MENTOR_TODOS_PAGE_SIZE', 7):
+            cursor = None
+            while True:
+                # Session, user, profile, one page of lists and one prefetch of their tasks
+                with self.assertNumQueries(5):
+                    response = self.client.get(self.url, {**params, **({'cursor': cursor} if cursor else {})})
+                seen += [(todo.submission_date, todo.pk) for todo in response.context['todos']]
+                cursor = response.context['next_cursor']
+                if cursor is None:
+                    break
+
+        self.assertEqual(len(seen), 18)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+        response = self.client.get(self.url, {'date': start.isoformat()})
+        self.assertEqual({todo.submission_date for todo in response.context['todos']}, {start})
 
-# Create your tests here.
+    def test_invalid_dates_fall_back_to_today(self):
+        response = self.client.get(self.url, {'start': '2026-02-31', 'end': 'soon'})
+        self.assertEqual((response.context['start'], response.context['end']), (self.today, self.today))
@@ -1,15 +1,25 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.contrib import messages
+from django.db.models import Case, Count, Max, Prefetch, Q, Value, When
+from mentorship_platform.filters import date_range
+from mentorship_platform.pagination import keyset_paginate
+from reports.services import may_review, refresh_task_counts, submitted_to
 from .models import TodoList, TodoItem
 from .forms import TodoListForm
-from notifications.services import NotificationService
+from .services import MAX_ITEMS, InvalidTodoItems, clean_item, create_todo_list, sync_todo_items
+
+MENTOR_TODOS_PAGE_SIZE = 20
 
 
 @login_required
 def todo_create_view(request):
-    if request.user.profile.role != 'mentee':
+    if not request.identity.is_mentee:
         messages.error(request, 'Only mentees can create todo lists.')
         return redirect('accounts:profile')
 
@@ -25,37 +35,29 @@ def todo_create_view(request):
         return redirect('todo:today')
 
     if request.method == 'POST':
-        # Create the todo list
-        todo_list = TodoList.objects.create(mentee=request.user)
-
         # Get the number of items from the form
-        item_count = int(request.POST.get('item_count', 1))
+        try:
+            item_count = min(int(request.POST.get('item_count', 1)), MAX_ITEMS)
+        except ValueError:
+            item_count = 1
 
-        # Add items from the form data
+        items = []
         for i in range(item_count):
             title = request.POST.get(f'title_{i}', '').strip()
-            priority = request.POST.get(f'priority_{i}', 'medium')
-
             if title:  # Only create if title is not empty
-                TodoItem.objects.create(
-                    todo_list=todo_list,
-                    title=title,
-                    priority=priority
-                )
-
-        messages.success(request, 'Todo list created successfully!')
-
-        # Notify mentor if assigned
-        current_mentor = request.user.profile.get_current_mentor()
-        if current_mentor:
-            NotificationService.send_notification(
-                recipient=current_mentor.user,
-                trigger_event='todo_submitted',
-                subject=f'Todo List Submitted by {request.user.username}',
-                message=f'{request.user.username} has created their daily todo list. '
-                       f'Please review it on the mentor dashboard.',
-                notification_type='email'
-            )
+                try:
+                    items.append(clean_item({'title': title, 'priority': request.POST.get(f'priority_{i}')}))
+                except InvalidTodoItems as e:
+                    messages.error(request, str(e))
+                    return render(request, 'todo/todo_form.html')
+
+        # The list and all items are written in one transaction; a duplicate
+        # submit returns the list created by the first one
+        _, created = create_todo_list(request.user, items, mentor=request.identity.current_mentor)
+        if created:
+            messages.success(request, 'Todo list created successfully!')
+        else:
+            messages.info(request, 'You have already created a todo list for today.')
 
         return redirect('todo:today')
 
@@ -64,7 +66,7 @@ def todo_create_view(request):
 
 @login_required
 def todo_today_view(request):
-    if request.user.profile.role != 'mentee':
+    if not request.identity.is_mentee:
         return redirect('accounts:profile')
 
     today = timezone.now().date()
@@ -73,15 +75,14 @@ def todo_today_view(request):
         submission_date=today
     ).first()
 
-    # Calculate progress
-    completed_count = 0
-    total_count = 0
-    if todo_list:
-        total_count = todo_list.tasks.count()
-        completed_count = todo_list.tasks.filter(status='completed').count()
+    # Progress is counted from the loaded tasks instead of extra COUNT queries
+    tasks = list(todo_list.tasks.all()) if todo_list else []
+    completed_count = sum(1 for task in tasks if task.status == 'completed')
+    total_count = len(tasks)
 
     context = {
         'todo_list': todo_list,
+        'tasks': tasks,
         'today': today,
         'completed_count': completed_count,
         'total_count': total_count
@@ -91,36 +92,54 @@ def todo_today_view(request):
 
 @login_required
 def mentor_todos_view(request):
-    if request.user.profile.role != 'mentor':
+    """
+    Mentees' todo lists for a day (``?date=``) or a range (``?start=&end=``),
+    newest first, defaulting to today.
+
+    Tasks are prefetched and progress counts annotated, and pages are
+    fetched by keyset cursor, so every page costs the same few queries.
+    """
+    if not request.identity.is_mentor:
         return redirect('accounts:profile')
 
-    mentees = request.user.profile.get_mentees()
-    mentee_ids = [m.user.id for m in mentees]
-
-    # Get today's todos from all mentees
     today = timezone.now().date()
+    start, end = date_range(request.GET)
+    start = start or end or today
+    end = end or start
+
     todos = TodoList.objects.filter(
-        mentee_id__in=mentee_ids,
-        submission_date=today
-    ).select_related('mentee')
+        submitted_to(request.user),
+        submission_date__range=(start, end)
+    ).select_related('mentee').prefetch_related(
+        Prefetch('tasks', queryset=TodoItem.objects.order_by('id'))
+    ).annotate(
+        total_count=Count('tasks'),
+        completed_count=Count('tasks', filter=Q(tasks__status='completed'))
+    )
+    todos, next_cursor = keyset_paginate(
+        todos, ('-submission_date', '-id'), cursor=request.GET.get('cursor'), page_size=MENTOR_TODOS_PAGE_SIZE
+    )
 
     context = {
         'todos': todos,
-        'today': today
+        'today': today,
+        'start': start,
+        'end': end,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor')
     }
     return render(request, 'todo/mentor_todos.html', context)
 
 
 @login_required
 def mentor_todo_detail_view(request, todo_id):
-    if request.user.profile.role != 'mentor':
+    if not request.identity.is_mentor:
         return redirect('accounts:profile')
 
     todo_list = get_object_or_404(TodoList, id=todo_id)
 
-    # Verify this todo belongs to one of the mentor's mentees
-    mentee_ids = [m.user.id for m in request.user.profile.get_mentees()]
-    if todo_list.mentee_id not in mentee_ids:
+    # Verify this list is by a current mentee or was submitted to this mentor within the organization
+    if not may_review(request.identity, todo_list):
         messages.error(request, 'You can only view todo lists of your mentees.')
         return redirect('todo:mentor_todos')
 
@@ -141,25 +160,103 @@ def mentor_todo_detail_view(request, todo_id):
 
 
 @login_required
+@require_POST
 def toggle_todo_item_view(request, item_id):
-    """Toggle the completion status of a todo item."""
-    if request.user.profile.role != 'mentee':
-        messages.error(request, 'Only mentees can update their todo items.')
-        return redirect('accounts:profile')
-
-    todo_item = get_object_or_404(TodoItem, id=item_id)
-
-    # Verify this todo item belongs to the logged-in mentee
-    if todo_item.todo_list.mentee != request.user:
+    """
+    Toggle the completion status of a todo item.
+
+    The page posts the status to set (``status``), so a repeated request is
+    harmless; without it the status is flipped. Either way it is one
+    conditional UPDATE that also checks the item belongs to the logged-in
+    mentee. With ``?format=json`` the new
+    status and the list's completed/total counts are returned instead of a
+    redirect, so the page can update in place.
+    """
+    wants_json = request.GET.get('format') == 'json'
+
+    status = request.POST.get('status')
+    if status not in ('pending', 'completed'):
+        status = Case(When(status='completed', then=Value('pending')), default=Value('completed'))
+    toggled = TodoItem.objects.filter(id=item_id, todo_list__mentee=request.user).update(status=status)
+    if not toggled:
+        if wants_json:
+            return JsonResponse({'error': 'Todo item not found.'}, status=404)
         messages.error(request, 'You can only update your own todo items.')
         return redirect('todo:today')
+    # The UPDATE sends no signals
+    refresh_task_counts(tasks__id=item_id)
 
-    # Toggle the status
-    if todo_item.status == 'pending':
-        todo_item.status = 'completed'
-    else:
-        todo_item.status = 'pending'
-    todo_item.save()
+    if not wants_json:
+        return redirect('todo:today')
+
+    # New status and list progress in one aggregate over the item's list
+    result = TodoItem.objects.filter(todo_list__tasks__id=item_id).aggregate(
+        new_status=Max('status', filter=Q(id=item_id)),
+        completed_count=Count('id', filter=Q(status='completed')),
+        total_count=Count('id')
+    )
+    return JsonResponse({
+        'id': item_id,
+        'status': result['new_status'],
+        'completed_count': result['completed_count'],
+        'total_count': result['total_count']
+    })
+
+def _todo_list_json(todo_list):
+    return {
+        'id': todo_list.id,
+        'submission_date': todo_list.submission_date.isoformat(),
+        'items': [
+            {'id': item.id, 'title': item.title, 'priority': item.priority, 'status': item.status}
+            for item in todo_list.tasks.order_by('id')
+        ],
+    }
 
-    messages.success(request, f'Todo item marked as {todo_item.status}.')
-    return redirect('todo:today')
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def todo_batch_view(request):
+    """
+    JSON endpoint for today's whole todo list.
+
+    GET returns the list. POST ``{"items": [...]}`` creates it, or replaces
+    its items when it exists: items with an ``id`` are updated, items without
+    one are added and missing ones are removed, all in one transaction.
+    """
+    if not request.identity.is_mentee:
+        return JsonResponse({'error': 'Only mentees have todo lists.'}, status=403)
+
+    today = timezone.now().date()
+    todo_list = TodoList.objects.filter(mentee=request.user, submission_date=today).first()
+
+    if request.method == 'GET':
+        if todo_list is None:
+            return JsonResponse({'error': 'No todo list for today.'}, status=404)
+        return JsonResponse(_todo_list_json(todo_list))
+
+    try:
+        payload = json.loads(request.body)
+        raw_items = payload['items']
+        if not isinstance(raw_items, list):
+            raise InvalidTodoItems('"items" must be a list.')
+        if len(raw_items) > MAX_ITEMS:
+            raise InvalidTodoItems(f'At most {MAX_ITEMS} items per list.')
+        items = [clean_item(item) for item in raw_items]
+
+        status = 200
+        if todo_list is None:
+            if any('id' in item for item in items):
+                raise InvalidTodoItems('New lists cannot reference item ids.')
+            todo_list, created = create_todo_list(request.user, items, mentor=request.identity.current_mentor)
+            if created:
+                status = 201
+            else:
+                # Lost a race with another request: apply this one on top
+                sync_todo_items(todo_list, items)
+        else:
+            sync_todo_items(todo_list, items)
+    except (ValueError, KeyError, TypeError) as e:
+        message = str(e) if isinstance(e, InvalidTodoItems) else 'Expected a JSON object with an "items" list.'
+        return JsonResponse({'error': message}, status=400)
+
+    return JsonResponse(_todo_list_json(todo_list), status=status)